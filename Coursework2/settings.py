@@ -142,6 +142,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+IMAGE_DERIVATIVE_WIDTHS = (160, 320, 640, 1280)  # widths of the smaller copies made of uploaded images
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_WORKERS = 2  # threads of each site process making the copies after uploads
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -161,3 +165,142 @@ EMAIL_USE_TLS = True
 
 ACCOUNT_USER_MODEL_USERNAME_FIELD = 'username'
 
+
+# Contest solution list updates (server-sent events)
+# Every open solution list holds a server thread while it waits for a change, so the site needs a threaded
+# server (runserver, gunicorn with gthread or gevent workers) or ASGI with enough threads for them.
+
+SOLUTION_STREAM_POLL_INTERVAL = 0.5  # seconds between checks of solution versions, one aggregate query each
+SOLUTION_STREAM_TIMEOUT = 60  # seconds before the stream is closed and the browser reconnects
+SOLUTION_STREAM_RECONNECT_DELAY = 0.1  # seconds the browser waits before reconnecting after a change
+
+# Contest status polling
+
+CONTEST_CONDITION_CACHE_TIMEOUT = 1  # seconds a contest status response is shared between participants
+
+# Judge
+
+JUDGE_NODE = int(os.getenv('JUDGE_NODE', 1))  # number of this judge box
+JUDGE_TEST_WORKERS = None  # tests of one solution run at the same time, min(CPU count, 4) if None
+JUDGE_WORKERS = None  # solutions judged at the same time, CPU count / JUDGE_TEST_WORKERS if None
+JUDGE_TEST_RESULT_BATCH = 50  # test results written to the database at once
+JUDGE_PROGRESS_INTERVAL = 0.5  # seconds between cur_test updates of a solution being judged
+JUDGE_TEST_OUTPUT_PREVIEW = 256  # bytes of the output kept in a test result
+JUDGE_POLL_INTERVAL = 0.5  # seconds between queue checks
+JUDGE_CLAIM_WINDOW = 200  # waiting solutions looked at when choosing the next ones fairly
+JUDGE_CLAIM_PER_AUTHOR = 5  # first waiting solutions of each author and priority which get into the claim window
+JUDGE_VALIDATION_DELAY = 5  # seconds a task validation waits for more edits of the task before it is judged
+JUDGE_WORK_DIR = None  # where working directories are created, system temp dir if None
+JUDGE_SANDBOX_POOL_SIZE = 1  # cleaned working directories with warm launchers kept by each judge process
+JUDGE_PYTHON_FORK_SERVER = True  # Python 3 solutions are forked from a warm interpreter instead of started per test
+JUDGE_PYTHON_PRELOAD_MODULES = [
+    # imported once by the fork server, solutions get them already loaded
+    'collections', 'itertools', 'functools', 'heapq', 'bisect', 'math', 're', 'string',
+]
+JUDGE_COMPILE_TIMEOUT = 30  # seconds
+JUDGE_WALL_TIME_FACTOR = 2  # wall clock limit is time limit multiplied by this factor
+JUDGE_SOLUTION_ENVIRONMENT = {  # the only environment variables compilers and solutions get
+    'PATH': os.getenv('PATH', '/usr/local/bin:/usr/bin:/bin'),
+    'LANG': 'C.UTF-8',
+}
+JUDGE_SOLUTION_USER = None  # unprivileged user solutions run as, the judge must be started as root to switch to it
+JUDGE_PROCESS_LIMIT = 256  # processes and threads of the solution user at once, the judge's own count too without JUDGE_SOLUTION_USER
+JUDGE_MEMORY_POLL_INTERVAL = 0.05  # seconds between checks of the memory used by all processes of a running solution
+JUDGE_ADDRESS_SPACE_HEADROOM_MEGABYTES = 4096  # address space of a single process above the memory limit, the JVM reserves much more than it uses
+JUDGE_OUTPUT_LIMIT_MEGABYTES = 64
+JUDGE_FLOAT_TOLERANCE = 1e-6  # absolute and relative error allowed in numbers of variable answer tasks
+JUDGE_COMPILE_CACHE_DIR = os.path.join(BASE_DIR, 'judge_cache/compile/')  # None disables the cache
+JUDGE_COMPILE_CACHE_SIZE_MEGABYTES = 1024  # least recently used binaries are removed above this size
+JUDGE_PRECOMPILED_HEADERS_DIR = os.path.join(BASE_DIR, 'judge_cache/headers/')  # built when the judge starts, None disables them
+
+JUDGE_PROBE_TIMEOUT = 10  # seconds a judge node waits for a language probe when it starts
+
+# Languages accepted by the site and the judge. source defaults to main.<extension>; limits of a
+# task are multiplied by time_multiplier and extended by memory_overhead_megabytes for the language;
+# a judge node only takes solutions in languages whose probe command succeeded on it.
+JUDGE_LANGUAGES = {
+    'ASM': {
+        'label': 'GNU Assembly Language',
+        'extension': 's',
+        'build': ['gcc', '-O2', '-o', 'main', 'main.s'],
+        'run': ['./main'],
+        'probe': ['gcc', '--version'],
+    },
+    'C99': {
+        'label': 'GNU GCC C99',
+        'extension': 'c',
+        'build': ['gcc', '-std=c99', '-O2', '-o', 'main', 'main.c', '-lm'],
+        'run': ['./main'],
+        'probe': ['gcc', '--version'],
+    },
+    'C11': {
+        'label': 'GNU GCC C11',
+        'extension': 'c',
+        'build': ['gcc', '-std=c11', '-O2', '-o', 'main', 'main.c', '-lm'],
+        'run': ['./main'],
+        'probe': ['gcc', '--version'],
+    },
+    'C++11': {
+        'label': 'GNU G++ C++ 11',
+        'extension': 'cpp',
+        'build': ['g++', '-std=c++11', '-O2', '-o', 'main', 'main.cpp'],
+        'run': ['./main'],
+        'precompiled_headers': ['bits/stdc++.h'],
+        'header_build': ['g++', '-std=c++11', '-O2'],  # flags must be the same as in build
+        'probe': ['g++', '--version'],
+    },
+    'C++14': {
+        'label': 'GNU G++ C++ 14',
+        'extension': 'cpp',
+        'build': ['g++', '-std=c++14', '-O2', '-o', 'main', 'main.cpp'],
+        'run': ['./main'],
+        'precompiled_headers': ['bits/stdc++.h'],
+        'header_build': ['g++', '-std=c++14', '-O2'],
+        'probe': ['g++', '--version'],
+    },
+    'C++17': {
+        'label': 'GNU G++ C++ 17',
+        'extension': 'cpp',
+        'build': ['g++', '-std=c++17', '-O2', '-o', 'main', 'main.cpp'],
+        'run': ['./main'],
+        'precompiled_headers': ['bits/stdc++.h'],
+        'header_build': ['g++', '-std=c++17', '-O2'],
+        'probe': ['g++', '--version'],
+    },
+    'C++20': {
+        'label': 'GNU G++ C++ 20',
+        'extension': 'cpp',
+        'build': ['g++', '-std=c++20', '-O2', '-o', 'main', 'main.cpp'],
+        'run': ['./main'],
+        'precompiled_headers': ['bits/stdc++.h'],
+        'header_build': ['g++', '-std=c++20', '-O2'],
+        'probe': ['g++', '-std=c++20', '-x', 'c++', '-fsyntax-only', '/dev/null'],
+    },
+    'Python2': {
+        'label': 'Python v2.7',
+        'extension': 'py',
+        'run': ['python2', 'main.py'],
+        'probe': ['python2', '--version'],
+    },
+    'Python3': {
+        'label': 'Python v3.9.4',
+        'extension': 'py',
+        'run': ['python3', 'main.py'],
+        'fork_server': ['python3'],  # used when JUDGE_PYTHON_FORK_SERVER is on
+        'probe': ['python3', '--version'],
+    },
+    'Java8': {
+        'label': 'Java 8',
+        'extension': 'java',
+        'source': 'Main.java',
+        'build': ['javac', 'Main.java'],
+        'run': ['java', '-cp', '.', 'Main'],
+        'time_multiplier': 2,  # JVM start
+        'memory_overhead_megabytes': 64,
+        'probe': ['java', '-version'],
+    },
+}
+JUDGE_DEFAULT_LANGUAGE = 'C++14'  # language of new tasks, must be one of JUDGE_LANGUAGES
+
+TEST_STORAGE_ROOT = os.path.join(BASE_DIR, 'test_storage/')  # must be shared by the site and all judge nodes
+TEST_INLINE_LIMIT = 64 * 1024  # bytes, larger tests are kept only in the test storage
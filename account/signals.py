@@ -0,0 +1,5 @@
+from management.images import register_image_fields
+
+from .models import UserProfile
+
+register_image_fields(UserProfile, 'profile_photo')
@@ -11,14 +11,17 @@ from django.views import View
 from django.contrib import messages
 
 from courses.models import Channel
+from management.pagination import KeysetPaginationMixin
 from .models import UserProfile, User, FriendRequest
 from .forms import UserRegistrationForm, UserEditForm, UserProfileEditForm, FriendRequestForm
 from .forms import AcceptFriendRequestForm, DeclineFriendRequestForm, DeleteFriendForm
 
 
-class UserList(ListView):
+class UserList(KeysetPaginationMixin, ListView):
     template_name = 'profile/profile_list.html'
     model = User
+    keyset_ordering = ('id',)
+    paginate_by = 100
 
     def get_queryset(self):
         return User.objects.all()
@@ -3,6 +3,7 @@ from django.forms.models import inlineformset_factory
 from datetimewidget.widgets import DateTimeWidget, TimeWidget
 
 from .models import *
+from management.toolchains import get_language_choices
 
 
 class ChannelForm(forms.ModelForm):
@@ -68,6 +69,11 @@ CourseTaskTestFormSet = inlineformset_factory(
 )
 
 
+class CodeListingForm(forms.ModelForm):
+    language = forms.ChoiceField(choices=lambda: [('', 'Обычный текст'), *get_language_choices()], required=False,
+                                 label='Язык')
+
+
 class ModuleForm(forms.ModelForm):
     class Meta:
         model = Module
@@ -86,6 +92,8 @@ class CourseDeleteStudentForm(forms.Form):
 
 
 class CourseTaskForm(forms.ModelForm):
+    solution_file_lang = forms.ChoiceField(choices=get_language_choices)
+
     class Meta:
         model = CourseTask
         fields = (
@@ -142,6 +150,18 @@ class ContestActionSolutionRejudge(forms.Form):
     pass
 
 
+class ContestRejudgeSolutionsForm(forms.Form):
+    task = forms.ModelChoiceField(queryset=CourseTask.objects.none(), required=False, label='Задача',
+                                  empty_label='Все задачи')
+    verdicts = forms.MultipleChoiceField(choices=Verdict.choices, required=False, label='Вердикты',
+                                         widget=forms.CheckboxSelectMultiple)
+
+    def __init__(self, *args, contest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if contest is not None:
+            self.fields['task'].queryset = CourseTask.objects.filter(id__in=contest.tasks.values('id'))
+
+
 class ContestActionDeleteParticipant(forms.Form):
     reason = forms.CharField()
 
@@ -152,17 +172,17 @@ class ContestParticipantRegistrationForm(forms.Form):
 
 class ContestSolutionSendSolutionForm(forms.Form):
     task = forms.ModelChoiceField(queryset=CourseTask.objects.all())
-    language = forms.ChoiceField(choices=Language.choices)
+    language = forms.ChoiceField(choices=get_language_choices)
     file = forms.FileField()
 
 
 class ContestSolutionSendCodeForm(forms.Form):
     task = forms.ModelChoiceField(queryset=CourseTask.objects.all())
-    language = forms.ChoiceField(choices=Language.choices)
+    language = forms.ChoiceField(choices=get_language_choices)
     code = forms.CharField(widget=forms.Textarea)
 
 
 class CourseTaskSendSolutionForm(forms.Form):
-    language = forms.ChoiceField(choices=Language.choices, label='Язык программирования')
+    language = forms.ChoiceField(choices=get_language_choices, label='Язык программирования')
     file = forms.FileField(required=False, label='Файл с кодом')
     code = forms.CharField(widget=forms.Textarea, required=False, label='Код')
@@ -0,0 +1,40 @@
+import hashlib
+
+from django.utils.html import escape
+
+from management.toolchains import get_toolchains
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import TextLexer, get_lexer_for_filename
+    from pygments.util import ClassNotFound
+except ImportError:
+    # without Pygments listings are shown as plain text
+    highlight = None
+
+HIGHLIGHTER_VERSION = '1'
+# changing it highlights all code listings again
+
+STYLE = 'default'
+
+
+def get_code_hash(code, language):
+    return hashlib.sha256(f'{HIGHLIGHTER_VERSION}\n{STYLE}\n{language}\n{code}'.encode('utf-8')).hexdigest()
+
+
+def get_lexer(language):
+    toolchain = get_toolchains().get(language)
+    if toolchain is None:
+        return TextLexer()
+    try:
+        return get_lexer_for_filename(f'source.{toolchain.extension}')
+    except ClassNotFound:
+        return TextLexer()
+
+
+def highlight_code(code, language):
+    if highlight is None:
+        return f'<pre><code>{escape(code)}</code></pre>'
+    # styles are inlined, so the listing doesn't depend on a stylesheet of the page
+    return highlight(code, get_lexer(language), HtmlFormatter(style=STYLE, noclasses=True))
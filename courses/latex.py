@@ -0,0 +1,126 @@
+import hashlib
+import re
+from html.parser import HTMLParser
+
+from django.utils.html import escape
+
+try:
+    from latex2mathml.converter import convert
+except ImportError:
+    # without the converter formulas are left to MathJax in the browser
+    convert = None
+
+RENDERER_VERSION = '2'
+# changing it renders all LaTeX items again
+
+DOCUMENT_BODY = re.compile(r'\\begin\{document\}(.*?)\\end\{document\}', re.DOTALL)
+COMMENT = re.compile(r'(?<!\\)%.*')
+FORMULA = re.compile(
+    r'\$\$(?P<display>.+?)\$\$|\\\[(?P<display_bracket>.+?)\\\]|(?<!\\)\$(?P<inline>.+?)(?<!\\)\$|\\\((?P<inline_bracket>.+?)\\\)',
+    re.DOTALL,
+)
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SPECIAL_CHARACTER = re.compile(r'\\([%$&_#{}])')
+
+MATHML_NAMESPACE = 'http://www.w3.org/1998/Math/MathML'
+MATHML_TAGS = {
+    'math', 'semantics', 'annotation', 'mrow', 'mi', 'mn', 'mo', 'ms', 'mtext', 'mspace', 'msub', 'msup',
+    'msubsup', 'mfrac', 'msqrt', 'mroot', 'mover', 'munder', 'munderover', 'mtable', 'mtr', 'mtd', 'mstyle',
+    'mpadded', 'mphantom', 'menclose', 'merror', 'mmultiscripts', 'mprescripts', 'none',
+}
+MATHML_ATTRIBUTES = {
+    'display', 'displaystyle', 'scriptlevel', 'mathvariant', 'mathsize', 'stretchy', 'fence', 'separator',
+    'lspace', 'rspace', 'minsize', 'maxsize', 'movablelimits', 'accent', 'accentunder', 'largeop', 'symmetric',
+    'form', 'width', 'height', 'depth', 'voffset', 'linethickness', 'notation', 'columnalign', 'columnlines',
+    'columnspacing', 'rowalign', 'rowlines', 'rowspacing', 'frame', 'columnspan', 'rowspan', 'encoding',
+}
+
+
+class MathMLSanitizer(HTMLParser):
+    # The converter copies text arguments like \text{...} into the output as they are, so everything but
+    # known MathML tags and attributes is dropped and all text is escaped again.
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+
+    def start(self, tag, attrs, closed=False):
+        if tag not in MATHML_TAGS:
+            return
+        parts = [tag]
+        for name, value in attrs:
+            if name == 'xmlns' and value == MATHML_NAMESPACE or name in MATHML_ATTRIBUTES and value is not None:
+                parts.append(f'{name}="{escape(value)}"')
+        self.parts.append(f'<{" ".join(parts)}{"/" if closed else ""}>')
+        if not closed:
+            self.open_tags.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        self.start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self.start(tag, attrs, closed=True)
+
+    def handle_endtag(self, tag):
+        # end tags of elements that aren't open would close the elements around the formula
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        self.parts.append(escape(data))
+
+
+def sanitize_mathml(html):
+    sanitizer = MathMLSanitizer()
+    sanitizer.feed(html)
+    sanitizer.close()
+    sanitizer.parts.extend(f'</{tag}>' for tag in reversed(sanitizer.open_tags))
+    return ''.join(sanitizer.parts)
+
+
+def get_source_hash(text):
+    return hashlib.sha256(f'{RENDERER_VERSION}\n{text}'.encode('utf-8')).hexdigest()
+
+
+def render_formula(match):
+    source = match.group(0)
+    display = match.group('display') or match.group('display_bracket')
+    formula = display or match.group('inline') or match.group('inline_bracket')
+    if convert is None:
+        return escape(source)
+    try:
+        return sanitize_mathml(convert(formula.strip(), display='block' if display else 'inline'))
+    except Exception:
+        # formulas the converter doesn't know are typeset by MathJax as before
+        return escape(source)
+
+
+def render_plain(text):
+    return escape(SPECIAL_CHARACTER.sub(r'\1', text))
+
+
+def render_text(text):
+    parts = []
+    position = 0
+    for match in FORMULA.finditer(text):
+        parts.append(render_plain(text[position:match.start()]))
+        parts.append(render_formula(match))
+        position = match.end()
+    parts.append(render_plain(text[position:]))
+    return ''.join(parts)
+
+
+def render_latex(text):
+    # uploaded files are usually whole documents, only the body is shown
+    body = DOCUMENT_BODY.search(text)
+    if body is not None:
+        text = body.group(1)
+    text = COMMENT.sub('', text)
+    paragraphs = [paragraph.strip() for paragraph in PARAGRAPH_BREAK.split(text)]
+    return ''.join(f'<p>{render_text(paragraph)}</p>' for paragraph in paragraphs if paragraph)
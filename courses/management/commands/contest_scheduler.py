@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.models import Contest
+
+
+class Command(BaseCommand):
+    help = 'Moves contests to the active and finished statuses at their start and finish time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds between status checks')
+        parser.add_argument('--once', action='store_true',
+                            help='Check statuses one time and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            rescheduled, started, finished = Contest.update_statuses()
+            if rescheduled or started or finished:
+                self.stdout.write(f'Contests rescheduled: {rescheduled}, '
+                                  f'started: {started}, finished: {finished}')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from courses.models import CodeListing, Module
+
+
+class Command(BaseCommand):
+    help = 'Highlights code listings saved before highlighting or with an older highlighter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Listings written with one query')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between batches, so the site is not slowed down')
+
+    def flush(self, batch):
+        CodeListing.objects.bulk_update(batch, ['html', 'html_hash'])
+        # bulk updates don't send signals, so pages of the modules are rendered again on the next view
+        Module.objects.filter(
+            content_list__content_type=ContentType.objects.get_for_model(CodeListing),
+            content_list__object_id__in=[listing.pk for listing in batch],
+        ).update(content_html=None)
+        batch.clear()
+
+    def handle(self, *args, **options):
+        listings = CodeListing.objects.only('code', 'language', 'html_hash').order_by('pk')
+        batch = []
+        highlighted = 0
+        for listing in listings.iterator(chunk_size=options['batch_size']):
+            if not listing.render_html():
+                continue
+            batch.append(listing)
+            highlighted += 1
+            if len(batch) >= options['batch_size']:
+                self.flush(batch)
+                time.sleep(options['pause'])
+        if batch:
+            self.flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Highlighted {highlighted} code listings'))
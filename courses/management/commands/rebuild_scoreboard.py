@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import ContestSolution, ContestScoreboardCell
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized scoreboard cells from contest solutions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest_id', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        solutions = ContestSolution.objects.all()
+        cells = ContestScoreboardCell.objects.all()
+        if options['contest_id']:
+            solutions = solutions.filter(participant__contest_id__in=options['contest_id'])
+            cells = cells.filter(participant__contest_id__in=options['contest_id'])
+
+        cells.delete()
+        keys = solutions.order_by().values_list('participant_id', 'task_id').distinct()
+        for participant_id, task_id in keys:
+            ContestScoreboardCell.refresh(participant_id, task_id)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(keys)} scoreboard cells'))
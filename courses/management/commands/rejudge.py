@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from management.models import Solution, SolutionEventType, Verdict
+
+
+class Command(BaseCommand):
+    help = 'Sends solutions of contests and tasks to the judge again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contest', type=int, action='append', dest='contests',
+                            help='Rejudge solutions of this contest, may be repeated')
+        parser.add_argument('--task', type=int, action='append', dest='tasks',
+                            help='Rejudge solutions of this task, may be repeated')
+        parser.add_argument('--verdict', action='append', dest='verdicts', choices=Verdict.values,
+                            help='Rejudge only solutions with this verdict, may be repeated')
+
+    def handle(self, *args, **options):
+        if not options['contests'] and not options['tasks']:
+            raise CommandError('Choose solutions with --contest or --task')
+
+        # author validations define the answers and are started from the task page
+        solutions = Solution.objects.filter(event_type=SolutionEventType.USER_TASK_SOLUTION)
+        if options['contests']:
+            solutions = solutions.filter(contestsolution__participant__contest_id__in=options['contests'])
+        if options['tasks']:
+            solutions = solutions.filter(task_id__in=options['tasks'])
+        if options['verdicts']:
+            solutions = solutions.filter(verdict__in=options['verdicts'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {solutions.rejudge()} solutions to the judge'))
@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from courses.models import LaTeX, Module
+
+
+class Command(BaseCommand):
+    help = 'Renders LaTeX items saved before server rendering or with an older renderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Items written with one query')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between batches, so the site is not slowed down')
+
+    def flush(self, batch):
+        LaTeX.objects.bulk_update(batch, ['html', 'html_hash'])
+        # bulk updates don't send signals, so pages of the modules are rendered again on the next view
+        Module.objects.filter(
+            content_list__content_type=ContentType.objects.get_for_model(LaTeX),
+            content_list__object_id__in=[item.pk for item in batch],
+        ).update(content_html=None)
+        batch.clear()
+
+    def handle(self, *args, **options):
+        items = LaTeX.objects.only('text', 'html_hash').order_by('pk')
+        batch = []
+        rendered = 0
+        for item in items.iterator(chunk_size=options['batch_size']):
+            html_hash = item.html_hash
+            item.render_html()
+            if item.html_hash == html_hash:
+                continue
+            batch.append(item)
+            rendered += 1
+            if len(batch) >= options['batch_size']:
+                self.flush(batch)
+                time.sleep(options['pause'])
+        if batch:
+            self.flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} LaTeX items'))
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.3 on 2021-06-03 12:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_auto_20210528_1433'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContestScoreboardCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('is_solved', models.BooleanField(default=False)),
+                ('first_accepted', models.DateTimeField(blank=True, null=True)),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scoreboard_cells', to='courses.contestparticipant')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scoreboard_cells', to='courses.coursetask')),
+            ],
+            options={
+                'ordering': ('participant', 'task'),
+                'unique_together': {('participant', 'task')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2021-06-07 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0022_contestscoreboardcell'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursetask',
+            name='solution_file_lang',
+            field=models.TextField(default='C++14'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2021-06-08 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0023_coursetask_solution_file_lang'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+    ]
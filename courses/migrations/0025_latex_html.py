@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2021-06-09 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0024_module_content_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='latex',
+            name='html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='latex',
+            name='html_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
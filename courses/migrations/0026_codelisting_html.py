@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2021-06-09 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0025_latex_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codelisting',
+            name='html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='codelisting',
+            name='html_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='codelisting',
+            name='language',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
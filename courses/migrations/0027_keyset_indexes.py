@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2021-06-10 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0026_codelisting_html'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contest',
+            index=models.Index(fields=['start_time', 'id'], name='courses_con_start_t_9f974c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['created', 'id'], name='courses_cou_created_36197f_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.3 on 2021-06-11 09:15
+
+from django.db import migrations
+
+
+def clear_latex_html(apps, schema_editor):
+    # html rendered before MathML was sanitized may contain markup from the source,
+    # the items show the escaped text until they are saved or the render_latex command is run
+    LaTeX = apps.get_model('courses', 'LaTeX')
+    LaTeX.objects.exclude(html_hash='').update(html='', html_hash='')
+    apps.get_model('courses', 'Module').objects.update(content_html=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0027_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_latex_html, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2021-06-11 14:20
+
+from django.db import migrations, models
+import management.toolchains
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0028_latex_render_again'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursetask',
+            name='solution_file_lang',
+            field=models.TextField(default=management.toolchains.get_default_language),
+        ),
+    ]
@@ -2,15 +2,22 @@ import datetime
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, Q
 from django.contrib.auth.models import User
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 from django.utils.timezone import now
 
 from management.fields import OrderField
 
-from management.models import AbstractTask, Test, Solution, Language, Status
+from management.models import AbstractTask, CodeFile, Test, Solution, Status, Verdict, QueuePriority, \
+    SolutionEventType
+from management.toolchains import get_default_language
+
+from .highlighting import get_code_hash, highlight_code
+from .latex import get_source_hash, render_latex
 
 
 class Channel(models.Model):
@@ -124,6 +131,7 @@ class Course(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [models.Index(fields=('created', 'id'))]
 
     def __str__(self):
         return self.title
@@ -155,12 +163,29 @@ class Module(models.Model):
 
     # just number of course
 
+    content_html = models.TextField(null=True, blank=True, editable=False)
+    # rendered content blocks of the module, None when they have changed since
+
     def __str__(self):
         return f'Модуль {self.order}: {self.title}'
 
     class Meta:
         ordering = ('order',)
 
+    def render_content(self):
+        # items are loaded with one query for each content type
+        contents = self.content_list.prefetch_related('item')
+        return ''.join(content.item.render() for content in contents if content.item is not None)
+
+    def get_content_html(self):
+        if self.content_html is None:
+            self.refresh_content_html()
+        return self.content_html
+
+    def refresh_content_html(self):
+        self.content_html = self.render_content()
+        Module.objects.filter(pk=self.pk).update(content_html=self.content_html)
+
 
 class ModuleDescriptionListElement(models.Model):
     module = models.ForeignKey(to=Module,
@@ -265,10 +290,42 @@ class PureText(ItemBase):
 class LaTeX(ItemBase):
     file = models.FileField(upload_to='course_LaTeX_files/')
     text = models.TextField(blank=True, default='')
+    html = models.TextField(blank=True, default='', editable=False)
+    html_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # text rendered on the server and the hash of the text it was rendered from
+
+    def render_html(self):
+        html_hash = get_source_hash(self.text)
+        if html_hash == self.html_hash:
+            return
+        # items with the same text are rendered once
+        html = LaTeX.objects.filter(html_hash=html_hash).values_list('html', flat=True).first()
+        self.html = html if html is not None else render_latex(self.text)
+        self.html_hash = html_hash
 
 
 class CodeListing(ItemBase):
     code = models.TextField(blank=True)
+    language = models.TextField(blank=True, default='')
+    # language of the judge the code is highlighted as, plain text if empty
+    html = models.TextField(blank=True, default='', editable=False)
+    html_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # highlighted code and the hash of the code and language it was made from
+
+    def render_html(self):
+        html_hash = get_code_hash(self.code, self.language)
+        if html_hash == self.html_hash:
+            return False
+        html = CodeListing.objects.filter(html_hash=html_hash).values_list('html', flat=True).first()
+        self.html = html if html is not None else highlight_code(self.code, self.language)
+        self.html_hash = html_hash
+        return True
+
+    def save(self, *args, **kwargs):
+        # highlighted once here instead of on every view of the module
+        if self.render_html() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'html', 'html_hash'}
+        super().save(*args, **kwargs)
 
 
 class Picture(ItemBase):
@@ -286,7 +343,7 @@ class CourseTask(AbstractTask):
 
     show_in_task_list = models.BooleanField(default=False)
     solution_file_raw = models.FileField(default=None, upload_to='course_files/')
-    solution_file_lang = models.TextField(choices=Language.choices, default=Language.GNU_CXX_14)
+    solution_file_lang = models.TextField(default=get_default_language)
     last_validate_solution = models.OneToOneField(to='CourseSolution', blank=True, default=None,
                                                   on_delete=models.DO_NOTHING, null=True)
     difficulty = models.IntegerField(default=1)
@@ -297,6 +354,45 @@ class CourseTask(AbstractTask):
     def __str__(self):
         return self.title
 
+    def request_validation(self, author):
+        # a validation still waiting in the queue is given the current solution instead of queueing another one
+        with transaction.atomic():
+            validation = CourseSolution.objects.select_for_update().select_related('code_file').filter(
+                course_task=self,
+                event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
+                status=Status.WAIT_FOR_CHECK,
+            ).order_by('-created').first()
+            solution_file = CodeFile.objects.get(pk=self.solution_file_id)
+            if validation is None:
+                code_file = CodeFile.objects.get(pk=solution_file.pk)
+                code_file.pk = None
+                code_file.save()
+                validation = CourseSolution.objects.create(
+                    author=author,
+                    code_file=code_file,
+                    course=self.course,
+                    course_task=self,
+                    task=self,
+                    node=1,
+                    event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
+                )
+            else:
+                code_file = validation.code_file
+                if code_file.pk != solution_file.pk:
+                    code_file.file = solution_file.file
+                    code_file.language = solution_file.language
+                    code_file.code = solution_file.code
+                    code_file.file_name = solution_file.file_name
+                    code_file.save()
+                # the judge waits JUDGE_VALIDATION_DELAY after the last request before taking it
+                validation.author = author
+                validation.created = timezone.now()
+                validation.version += 1
+                validation.save(update_fields=['author', 'created', 'version'])
+            self.last_validate_solution = validation
+            self.save(update_fields=['last_validate_solution'])
+        return validation
+
 
 class CourseSolution(Solution):
     course = models.ForeignKey(to=Course,
@@ -331,6 +427,31 @@ class Contest(models.Model):
 
     class Meta:
         ordering = ('-start_time',)
+        indexes = [models.Index(fields=('start_time', 'id'))]
+
+    def get_finish_time(self):
+        return self.start_time + self.duration
+
+    @classmethod
+    def update_statuses(cls, now=None):
+        # every transition filters on the current status, so it is applied exactly once
+        now = now or timezone.now()
+        contests = cls.objects.annotate(
+            finish_time=models.ExpressionWrapper(F('start_time') + F('duration'),
+                                                 output_field=models.DateTimeField()),
+        )
+        rescheduled = contests.filter(
+            start_time__gt=now,
+        ).exclude(status=ContestStatus.WAIT_FOR_START).update(status=ContestStatus.WAIT_FOR_START)
+        started = contests.filter(
+            status=ContestStatus.WAIT_FOR_START,
+            start_time__lte=now,
+            finish_time__gt=now,
+        ).update(status=ContestStatus.ACTIVE)
+        finished = contests.filter(
+            finish_time__lte=now,
+        ).exclude(status=ContestStatus.FINISHED).update(status=ContestStatus.FINISHED)
+        return rescheduled, started, finished
 
 
 class ContestParticipant(models.Model):
@@ -353,8 +474,61 @@ class ContestSolution(Solution):
                                     on_delete=models.CASCADE,
                                     default=None)
 
+    def get_queue_priority(self):
+        if self.participant.contest.status == ContestStatus.ACTIVE:
+            return QueuePriority.CONTEST
+        return super().get_queue_priority()
+
     def get_status(self):
         d = dict()
         for elem in Status.choices:
             d[elem[0]] = elem[1]
         return d[self.status]
+
+
+class ContestScoreboardCell(models.Model):
+    participant = models.ForeignKey(to=ContestParticipant,
+                                    related_name='scoreboard_cells',
+                                    on_delete=models.CASCADE)
+    task = models.ForeignKey(to=CourseTask,
+                             related_name='scoreboard_cells',
+                             on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=0)
+    points = models.IntegerField(default=0)
+    # best points among participant's solutions of the task
+    is_solved = models.BooleanField(default=False)
+    first_accepted = models.DateTimeField(null=True, blank=True)
+
+    # one cell of the contest scoreboard, kept in sync with ContestSolution rows
+
+    class Meta:
+        ordering = ('participant', 'task')
+        unique_together = ('participant', 'task')
+
+    @classmethod
+    def refresh(cls, participant_id, task_id):
+        solutions = ContestSolution.objects.filter(
+            participant_id=participant_id,
+            task_id=task_id,
+        )
+        with transaction.atomic():
+            if not solutions.exists():
+                cls.objects.filter(participant_id=participant_id, task_id=task_id).delete()
+                return None
+
+            # lock the cell before aggregating, so concurrent verdicts can't overwrite each other
+            cell, _ = cls.objects.select_for_update().get_or_create(
+                participant_id=participant_id,
+                task_id=task_id,
+            )
+            stats = solutions.aggregate(
+                attempts=Count('id'),
+                points=Max('points'),
+                first_accepted=Min('created', filter=Q(verdict=Verdict.CORRECT_SOLUTION)),
+            )
+            cell.attempts = stats['attempts']
+            cell.points = max(stats['points'] or 0, 0)
+            cell.first_accepted = stats['first_accepted']
+            cell.is_solved = stats['first_accepted'] is not None
+            cell.save()
+        return cell
@@ -0,0 +1,71 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from management.images import register_image_fields
+from management.models import Solution
+
+from .models import ContestSolution, ContestScoreboardCell, Module, Content, PureText, LaTeX, CodeListing, Picture, \
+    VideoLink, Channel, Course, CourseDescriptionBlock
+
+
+@receiver(post_save, sender=Solution)
+@receiver(post_save, sender=ContestSolution)
+def update_scoreboard_cell(sender, instance, created, **kwargs):
+    if not created and not {'verdict', 'points'} & instance.get_changed_fields():
+        return
+
+    if isinstance(instance, ContestSolution):
+        key = (instance.participant_id, instance.task_id)
+    else:
+        # judge writes through the base model, so look up the contest part of the row
+        key = ContestSolution.objects.filter(pk=instance.pk).values_list('participant_id', 'task_id').first()
+        if key is None:
+            return
+
+    ContestScoreboardCell.refresh(*key)
+
+
+@receiver(post_delete, sender=ContestSolution)
+def remove_solution_from_scoreboard(sender, instance, **kwargs):
+    ContestScoreboardCell.refresh(instance.participant_id, instance.task_id)
+
+
+@receiver(post_save, sender=PureText)
+@receiver(post_save, sender=LaTeX)
+@receiver(post_save, sender=CodeListing)
+@receiver(post_save, sender=Picture)
+@receiver(post_save, sender=VideoLink)
+@receiver(post_delete, sender=PureText)
+@receiver(post_delete, sender=LaTeX)
+@receiver(post_delete, sender=CodeListing)
+@receiver(post_delete, sender=Picture)
+@receiver(post_delete, sender=VideoLink)
+def update_module_content_html(sender, instance, **kwargs):
+    modules = Module.objects.filter(
+        content_list__content_type=ContentType.objects.get_for_model(sender),
+        content_list__object_id=instance.pk,
+    ).distinct()
+    for module in modules:
+        module.refresh_content_html()
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def update_module_content_list_html(sender, instance, **kwargs):
+    # blocks are added and removed by the author, the module is rendered again on the next view
+    Module.objects.filter(pk=instance.module_id).update(content_html=None)
+
+
+def reset_picture_modules(picture_id):
+    # rendered modules link the picture itself until its derivatives are there
+    Module.objects.filter(
+        content_list__content_type=ContentType.objects.get_for_model(Picture),
+        content_list__object_id=picture_id,
+    ).update(content_html=None)
+
+
+register_image_fields(Channel, 'preview_image')
+register_image_fields(Course, 'preview_picture')
+register_image_fields(CourseDescriptionBlock, 'image')
+register_image_fields(Picture, 'image', on_made=reset_picture_modules)
@@ -1,3 +1,190 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import skipIf
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from management.models import CodeFile, QueuePriority, SolutionEventType, Status, TaskAnswerType, Verdict
+from .latex import convert, render_latex, sanitize_mathml
+from .models import Channel, Contest, ContestParticipant, ContestScoreboardCell, ContestSolution, ContestStatus, Course, \
+    CourseSolution, CourseTask
+
+
+class SanitizeMathMLTest(SimpleTestCase):
+    def test_unknown_tags_and_attributes_are_dropped(self):
+        html = sanitize_mathml('<math xmlns="http://www.w3.org/1998/Math/MathML"><mtext href="javascript:x" '
+                               'onclick="x()"><img src=x onerror=alert(1)>a &lt; b</mtext></math>')
+        self.assertEqual(html, '<math xmlns="http://www.w3.org/1998/Math/MathML"><mtext>a &lt; b</mtext></math>')
+
+    def test_unopened_end_tags_are_dropped(self):
+        self.assertEqual(sanitize_mathml('<math><mi>x</mi></mtext></math></math>'), '<math><mi>x</mi></math>')
+
+    def test_open_tags_are_closed(self):
+        self.assertEqual(sanitize_mathml('<math><mrow><mi>x'), '<math><mrow><mi>x</mi></mrow></math>')
+
+
+@skipIf(convert is None, 'latex2mathml is not installed')
+class RenderLaTeXTest(SimpleTestCase):
+    def test_text_argument_is_escaped(self):
+        html = render_latex(r'$\text{<img/src/onerror=alert(1)>}$')
+        self.assertNotIn('<img', html)
+        self.assertNotIn('onerror', html)
+
+    def test_href_is_dropped(self):
+        self.assertNotIn('javascript', render_latex(r'$\href{javascript:alert(1)}{x}$'))
+
+    def test_formula_is_converted(self):
+        self.assertIn('<mfrac>', render_latex(r'$$\frac{a}{b}$$'))
+
+    def test_plain_text_is_escaped(self):
+        self.assertEqual(render_latex(r'<b>50\%</b>'), '<p>&lt;b&gt;50%&lt;/b&gt;</p>')
+
+
+class ContestTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner')
+        channel = Channel.objects.create(owner=cls.owner, title='channel', slug='channel')
+        cls.course = Course.objects.create(owner=cls.owner, channel=channel, title='course', slug='course')
+        cls.tasks = [
+            CourseTask.objects.create(course=cls.course, title=f'task {number}',
+                                      answer_type=TaskAnswerType.CONSTANT_ANSWER)
+            for number in range(2)
+        ]
+        cls.contest = Contest.objects.create(course=cls.course, title='contest',
+                                             start_time=timezone.now() - timedelta(minutes=5))
+        cls.contest.tasks.add(*cls.tasks)
+        cls.participant = ContestParticipant.objects.create(contest=cls.contest,
+                                                            user=User.objects.create(username='participant'))
+
+    def submit(self, task, **fields):
+        fields.setdefault('created', timezone.now())
+        code_file = CodeFile.objects.create(file='main.py', language='Python3', code='print(1)')
+        return ContestSolution.objects.create(participant=self.participant, author=self.participant.user,
+                                              code_file=code_file, task=task, **fields)
+
+
+class ScoreboardCellTest(ContestTestCase):
+    def get_cell(self):
+        return ContestScoreboardCell.objects.get(participant=self.participant, task=self.tasks[0])
+
+    def test_verdicts_are_counted(self):
+        self.submit(self.tasks[0], verdict=Verdict.WRONG_ANSWER)
+        accepted = self.submit(self.tasks[0], verdict=Verdict.CORRECT_SOLUTION, points=1)
+        self.submit(self.tasks[0], verdict=Verdict.CORRECT_SOLUTION, points=1)
+
+        cell = self.get_cell()
+        self.assertEqual((cell.attempts, cell.points, cell.is_solved), (3, 1, True))
+        self.assertEqual(cell.first_accepted, accepted.created)
+        self.assertFalse(ContestScoreboardCell.objects.filter(task=self.tasks[1]).exists())
+
+    def test_judged_solution_updates_the_cell(self):
+        solution = self.submit(self.tasks[0])
+        self.assertFalse(self.get_cell().is_solved)
+
+        solution.verdict = Verdict.CORRECT_SOLUTION
+        solution.points = 1
+        solution.save()
+        self.assertTrue(self.get_cell().is_solved)
+
+    def test_cell_is_removed_with_the_last_solution(self):
+        solution = self.submit(self.tasks[0])
+        solution.delete()
+        self.assertIsNone(ContestScoreboardCell.refresh(self.participant.id, self.tasks[0].id))
+        self.assertFalse(ContestScoreboardCell.objects.exists())
+
+
+class ContestStatusTest(ContestTestCase):
+    def create_contest(self, start_time, status):
+        return Contest.objects.create(course=self.course, title='contest', start_time=start_time,
+                                      duration=timedelta(hours=2), status=status)
+
+    def test_transitions(self):
+        now = timezone.now()
+        waiting = self.create_contest(now + timedelta(hours=1), ContestStatus.WAIT_FOR_START)
+        started = self.create_contest(now - timedelta(hours=1), ContestStatus.WAIT_FOR_START)
+        finished = self.create_contest(now - timedelta(hours=3), ContestStatus.ACTIVE)
+        # never started while the scheduler was down
+        skipped = self.create_contest(now - timedelta(hours=3), ContestStatus.WAIT_FOR_START)
+        # moved to a later time by the author
+        rescheduled = self.create_contest(now + timedelta(hours=1), ContestStatus.ACTIVE)
+        self.assertEqual(Contest.update_statuses(now), (1, 2, 2))
+        statuses = dict(Contest.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {
+            self.contest.id: ContestStatus.ACTIVE,
+            waiting.id: ContestStatus.WAIT_FOR_START,
+            started.id: ContestStatus.ACTIVE,
+            finished.id: ContestStatus.FINISHED,
+            skipped.id: ContestStatus.FINISHED,
+            rescheduled.id: ContestStatus.WAIT_FOR_START,
+        })
+        # applied exactly once
+        self.assertEqual(Contest.update_statuses(now), (0, 0, 0))
+
+
+class RejudgeSolutionsTest(ContestTestCase):
+    def setUp(self):
+        self.wrong = self.submit(self.tasks[0], status=Status.CHECK_SUCCESS, verdict=Verdict.WRONG_ANSWER)
+        self.correct = self.submit(self.tasks[0], status=Status.CHECK_SUCCESS, verdict=Verdict.CORRECT_SOLUTION,
+                                   points=1)
+        self.other_task = self.submit(self.tasks[1], status=Status.CHECK_SUCCESS, verdict=Verdict.WRONG_ANSWER)
+        self.url = reverse('rejudge_contest_solutions', kwargs={'slug': self.course.slug, 'id': self.contest.id})
+
+    def test_rejudge_resets_the_solutions(self):
+        self.assertEqual(ContestSolution.objects.filter(pk=self.correct.pk).rejudge(), 1)
+        solution = ContestSolution.objects.get(pk=self.correct.pk)
+        self.assertEqual((solution.status, solution.verdict, solution.points, solution.priority),
+                         (Status.WAIT_FOR_CHECK, Verdict.EMPTY_VERDICT, 0, QueuePriority.REJUDGE))
+        self.assertEqual(solution.version, self.correct.version + 1)
+        self.assertIsNotNone(solution.enqueued)
+
+    def test_solutions_are_chosen_by_task_and_verdict(self):
+        self.client.force_login(self.owner)
+        response = self.client.post(self.url, {'task': self.tasks[0].id, 'verdicts': [Verdict.WRONG_ANSWER]})
+        self.assertEqual(response.status_code, 302)
+        statuses = dict(ContestSolution.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {
+            self.wrong.id: Status.WAIT_FOR_CHECK,
+            self.correct.id: Status.CHECK_SUCCESS,
+            self.other_task.id: Status.CHECK_SUCCESS,
+        })
+
+    def test_only_the_course_owner_rejudges(self):
+        self.client.force_login(self.participant.user)
+        response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ContestSolution.objects.filter(status=Status.WAIT_FOR_CHECK).exists())
+
+
+class RequestValidationTest(ContestTestCase):
+    def set_solution(self, code):
+        task = self.tasks[0]
+        task.solution_file = CodeFile.objects.create(file='main.py', language='Python3', code=code)
+        task.save()
+        return task
+
+    def get_validations(self):
+        return CourseSolution.objects.filter(course_task=self.tasks[0],
+                                             event_type=SolutionEventType.AUTHOR_TASK_VALIDATION)
+
+    def test_waiting_validation_takes_the_new_solution(self):
+        first = self.set_solution('print(1)').request_validation(self.owner)
+        task = self.set_solution('print(2)')
+        second = task.request_validation(self.owner)
+
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(self.get_validations().count(), 1)
+        self.assertEqual(second.code_file.code, 'print(2)')
+        self.assertNotEqual(second.code_file.pk, task.solution_file.pk)
+        self.assertEqual(second.version, first.version + 1)
+        self.assertEqual(CourseTask.objects.get(pk=task.pk).last_validate_solution_id, second.pk)
+
+    def test_judged_validation_is_not_reused(self):
+        first = self.set_solution('print(1)').request_validation(self.owner)
+        CourseSolution.objects.filter(pk=first.pk).update(status=Status.CHECK_SUCCESS)
+        second = self.tasks[0].request_validation(self.owner)
+
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(self.get_validations().count(), 2)
@@ -160,6 +160,10 @@ urlpatterns = [
          ContestSolutionsListView.as_view(),
          name='contest_solutions_list', ),
 
+    path('course/<slug:slug>/contest/<id>/edit_solutions/rejudge/',
+         ContestRejudgeSolutionsFormHandle.as_view(),
+         name='rejudge_contest_solutions', ),
+
     path('course/<slug:slug>/contest/<id>/edit_solution/<solution_id>/',
          ContestSolutionDetailView.as_view(),
          name='contest_solution_detail', ),
@@ -288,6 +292,10 @@ urlpatterns = [
          update_contest_solutions,
          name='update_solution_list', ),
 
+    path('contest/<id>/solution_list_stream/',
+         stream_contest_solutions,
+         name='stream_solution_list', ),
+
     path('courses/',
          CourseListViewMain.as_view(),
          name='course_catalog', ),
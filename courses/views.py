@@ -10,13 +10,21 @@ from django.views.generic.base import View, TemplateResponseMixin
 from django.forms.models import modelform_factory
 from django.apps import apps
 import uuid
+import json
+import time
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.db.models import Count, Q, Sum
 
 from django.core.files import File
 
 from .models import *
-from management.models import CodeFile, SolutionEventType, Status, Verdict, lang_extension
+from management.models import CodeFile, Status
+from management.pagination import KeysetPaginationMixin
+from management.toolchains import get_toolchain
 
 from .forms import *
 
@@ -549,6 +557,7 @@ class ContentCreateUpdateView(TemplateView, TemplateResponseMixin, View):
     @staticmethod
     def get_form(model, *args, **kwargs):
         form = modelform_factory(model=model,
+                                 form=CodeListingForm if model == CodeListing else forms.ModelForm,
                                  exclude=[
                                      'owner',
                                      'order',
@@ -581,10 +590,13 @@ class ContentCreateUpdateView(TemplateView, TemplateResponseMixin, View):
             obj.owner = self.request.user
             obj.save()
 
-            if not id:
-                if self.model == LaTeX:
+            if self.model == LaTeX:
+                if not id:
                     obj.text = obj.file.read().decode('utf-8')
-                    obj.save()
+                # math is typeset once per edit, not in the browser of every student
+                obj.render_html()
+                obj.save()
+            if not id:
                 Content.objects.create(module=self.module, item=obj)
 
             messages.success(self.request, 'Контент сохранен')
@@ -623,7 +635,7 @@ class CourseModuleContentListView(TemplateView, LoginRequiredMixin):
             course=context['course'],
             order=self.kwargs.get('order', None)
         )
-        qs = Content.objects.all()
+        qs = Content.objects.prefetch_related('item')
         context['object_list'] = qs.filter(module=context['module'])
         return context
 
@@ -671,18 +683,7 @@ class CourseTaskCreateFormHandle(FormView):
 
             form.instance.solution_file = new_code_file
             form.save()
-            task_validate_solution = CourseSolution.objects.create(
-                author=self.request.user,
-                code_file=new_code_file,
-                task=form.instance,
-                node=1,
-                event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
-                course=form.instance.course,
-                course_task=form.instance,
-            )
-            task_validate_solution.save()
-            form.instance.last_validate_solution = task_validate_solution
-            form.save()
+            form.instance.request_validation(self.request.user)
             messages.success(self.request, 'Задача сохранена')
 
         return super().form_valid(form)
@@ -694,21 +695,7 @@ class CourseTaskCreateFormHandle(FormView):
 class CourseTaskUpdateView(UpdateView):
     template_name = 'task/task_update.html'
     model = CourseTask
-    fields = (
-        'title',
-        'task_description',
-        'input_description',
-        'output_description',
-        'input_example',
-        'output_example',
-        'time_limit_seconds',
-        'answer_type',
-        'grading_system',
-        'solution_file_raw',
-        'solution_file_lang',
-        'show_in_task_list',
-        'difficulty',
-    )
+    form_class = CourseTaskForm
 
     def get_object(self, queryset=None):
         return get_object_or_404(CourseTask, id=self.kwargs.get('id', None))
@@ -721,25 +708,7 @@ class CourseTaskUpdateView(UpdateView):
             code_file.code = form.cleaned_data['solution_file_raw'].read().decode('utf-8')
             code_file.save()
             form.save()
-
-            c_f = code_file
-            c_f.pk = None
-            c_f.save()
-
-            task_validate_solution = CourseSolution.objects.create(
-                author=self.request.user,
-                code_file=c_f,
-                task=form.instance,
-                course=form.instance.course,
-                course_task=form.instance,
-                node=1,
-                event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
-            )
-            task_validate_solution.save()
-
-            form.instance.solution_file = code_file
-            form.instance.last_validate_solution = task_validate_solution
-            form.save()
+            form.instance.request_validation(self.request.user)
 
             messages.success(self.request, 'Задача обновлена')
         return super().form_valid(form)
@@ -800,26 +769,10 @@ class CourseTaskTestView(TemplateView, TemplateResponseMixin, View):
             formset.save()
             messages.success(request, 'Тесты сохранены')
 
-            c_f = task.solution_file
-            c_f.pk = None
-            c_f.save()
-
-            if len(formset) > 0:
-                task_validate_solution = CourseSolution.objects.create(
-                    author=self.request.user,
-                    code_file=c_f,
-                    course=task.course,
-                    course_task=task,
-                    task=task,
-                    node=1,
-                    event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
-                )
-                task_validate_solution.save()
-                if task.last_validate_solution:
-                    task.last_validate_solution = task_validate_solution
-                else:
-                    task.last_validate_solution = task_validate_solution
-                task.save()
+            # only the added and changed tests are run by the validation and the rejudge after it
+            if len(formset) > 0 and formset.has_changed():
+                # tests_version was changed by the saved tests, so only the validation is written back
+                task.request_validation(self.request.user)
 
             return HttpResponseRedirect(reverse('course_task_tests', kwargs=self.kwargs))
         messages.error(request, 'Ошибка при сохранении тестов')
@@ -961,9 +914,10 @@ class ContestTaskListFormHandle(FormView):
         return reverse('contest_edit_tasks', kwargs=self.kwargs)
 
 
-class ContestSolutionsListView(ListView):
+class ContestSolutionsListView(KeysetPaginationMixin, ListView):
     model = ContestSolution
     template_name = 'contest/contest_solutions.html'
+    keyset_ordering = ('-created', '-id')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -975,10 +929,11 @@ class ContestSolutionsListView(ListView):
         context['contest'] = get_object_or_404(
             Contest, id=self.kwargs.get('id', None)
         )
+        context['rejudge_form'] = ContestRejudgeSolutionsForm(contest=context['contest'])
         return context
 
     def get_queryset(self):
-        qs = ContestSolution.objects.all()
+        qs = ContestSolution.objects.select_related('participant__user')
         contest = get_object_or_404(
             Contest,
             id=self.kwargs.get('id', None)
@@ -986,6 +941,36 @@ class ContestSolutionsListView(ListView):
         return qs.filter(participant__contest=contest)
 
 
+class ContestRejudgeSolutionsFormHandle(FormView):
+    template_name = 'contest/contest_solutions.html'
+    form_class = ContestRejudgeSolutionsForm
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['contest'] = get_object_or_404(Contest, id=self.kwargs.get('id', None))
+        return kwargs
+
+    def form_valid(self, form):
+        contest = get_object_or_404(Contest, id=self.kwargs.get('id', None))
+        if contest.course.owner != self.request.user:
+            raise Http404
+        solutions = ContestSolution.objects.filter(participant__contest=contest)
+        if form.cleaned_data['task']:
+            solutions = solutions.filter(task=form.cleaned_data['task'])
+        if form.cleaned_data['verdicts']:
+            solutions = solutions.filter(verdict__in=form.cleaned_data['verdicts'])
+        count = solutions.rejudge()
+        messages.success(self.request, f'Отправлено на перепроверку решений: {count}')
+        return super().form_valid(form=form)
+
+    def form_invalid(self, form):
+        messages.error(self.request, 'Не удалось отправить решения на перепроверку')
+        return redirect(self.get_success_url())
+
+    def get_success_url(self):
+        return reverse('contest_solutions_list', kwargs=self.kwargs)
+
+
 class ContestSolutionDetailView(DetailView):
     model = ContestSolution
     template_name = 'contest/contest_solution_detail.html'
@@ -1023,10 +1008,7 @@ class ContestActionSolutionRejudgeFormHandle(FormView):
             ContestSolution,
             id=self.kwargs.get('solution_id', None)
         )
-        solution.status = Status.WAIT_FOR_CHECK
-        solution.verdict = Verdict.EMPTY_VERDICT
-        solution.verdict_text = 'Посылка не проверена'
-        solution.save()
+        ContestSolution.objects.filter(id=solution.id).rejudge()
         return super().form_valid(form=form)
 
     def get_success_url(self):
@@ -1161,36 +1143,22 @@ class ContestParticipantMixin(TemplateView):
                     self.try_count = 0
                     self.all_try_count = None
 
-            a = [TableTaskElem() for _ in range(c.tasks.all().count())]
-            for i, t in enumerate(c.tasks.all()):
-
-                s = set()
-
-                sol = ContestSolution.objects.filter(
-                    task=t.id,
-                    verdict=Verdict.CORRECT_SOLUTION,
-                )
-
-                for par in sol:
-                    s.add(par.participant.user.username)
-
-                a[i].all_try_count = len(s)
-                print()
-                if ContestSolution.objects.filter(
-                        participant=p,
-                        task_id=t.id,
-                ).count() > 0:
-                    a[i].try_count = -1
-                    if ContestSolution.objects.filter(
-                            participant=p,
-                            verdict=Verdict.CORRECT_SOLUTION,
-                        task_id=t.id,
-                    ).count() > 0:
-
-                        a[i].try_count = 1
+            tasks = c.tasks.all()
+            cells = ContestScoreboardCell.objects.filter(participant__contest=c)
+            solved_count = dict(
+                cells.filter(is_solved=True).order_by().values('task_id').annotate(
+                    n=Count('id')
+                ).values_list('task_id', 'n')
+            )
+            own_cells = {cell.task_id: cell for cell in cells.filter(participant=p)} if p else {}
+
+            a = [TableTaskElem() for _ in range(len(tasks))]
+            for i, t in enumerate(tasks):
+                a[i].all_try_count = solved_count.get(t.id, 0)
+                cell = own_cells.get(t.id)
+                if cell is not None:
+                    a[i].try_count = 1 if cell.is_solved else -1
             context['table_task'] = a
-            for x in a:
-                print(x)
         except ObjectDoesNotExist:
             context['participant'] = None
         return context
@@ -1292,7 +1260,7 @@ class ContestParticipantSolutionSendCodeFormHandle(FormView, ContestParticipantM
     # noinspection DuplicatedCode
     def form_valid(self, form):
         if form.is_valid():
-            file_name = f'{str(uuid.uuid4())}.{lang_extension[form.cleaned_data["language"]]}'
+            file_name = f'{str(uuid.uuid4())}.{get_toolchain(form.cleaned_data["language"]).extension}'
             file = open(f'media/raw_code/{file_name}', 'w')
             file.write(form.cleaned_data['code'])
             file.close()
@@ -1383,11 +1351,16 @@ class ContestParticipantScoreboardView(ContestParticipantMixin):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        contest = context['contest']
         participants = ContestParticipant.objects.filter(
-            contest=self.get_contest(),
-        )
-        tasks = self.get_contest().tasks.all()
+            contest=contest,
+        ).select_related('user')
+        tasks = contest.tasks.all()
         context['tasks'] = tasks
+        cells = {
+            (cell.participant_id, cell.task_id): cell
+            for cell in ContestScoreboardCell.objects.filter(participant__contest=contest)
+        }
         table = []
         for participant in participants:
             user = self.User()
@@ -1395,28 +1368,23 @@ class ContestParticipantScoreboardView(ContestParticipantMixin):
             stats = [self.TableElement() for _ in range(len(tasks))]
             solved_cnt = 0
             points = 0
-            for i in range(len(tasks)):
-                solutions = ContestSolution.objects.filter(
-                    participant=participant,
-                    task=tasks[i],
-                )
-                stats[i].try_count = len(solutions)
-                stats[i].points = max([s.points for s in solutions] + [0])
-                print([s.points for s in solutions])
+            for i, task in enumerate(tasks):
+                cell = cells.get((participant.id, task.id))
+                stats[i].try_count = cell.attempts if cell else 0
+                stats[i].points = cell.points if cell else 0
+                stats[i].is_solved = cell.is_solved if cell else False
                 points += stats[i].points
-                stats[i].is_solved = True if Verdict.CORRECT_SOLUTION in [s.verdict for s in solutions] else False
                 if stats[i].is_solved:
                     solved_cnt += 1
             user.stats = stats
             user.task_solved = solved_cnt
             user.points = points
             user.penalty = participant.penalty
-            if context['contest'].status == ContestStatus.FINISHED:
+            if contest.status == ContestStatus.FINISHED:
                 user.type = 0
             table.append(user)
         table.sort(key=lambda x: x.task_solved, reverse=True)
         context['table'] = table
-        print(table[0].points)
         return context
 
 
@@ -1433,110 +1401,132 @@ class ContestParticipantDeleteView(TemplateView):
 
 
 def contest_condition_update_view(request, id):
-    contest = Contest.objects.get(id=id)
-    now_time = timezone.now() + datetime.timedelta(hours=3)
-    start = contest.start_time + datetime.timedelta(hours=3)
-    finish = contest.start_time + contest.duration + datetime.timedelta(hours=3)
-    data = {
-        'contest_status': 'wait_for_start',
-        'alert_action': 0,
-        'alert_message': None,
-        'timer': None,
-    }
-    if now_time < start:
-        if contest.status == ContestStatus.WAIT_FOR_START:
-            pass
-        else:
-            contest.status = ContestStatus.WAIT_FOR_START
-    if start <= now_time <= finish:
+    # status is moved by the contest_scheduler command, so polling only reads it
+    cache_key = f'contest_condition_{id}'
+    data = cache.get(cache_key)
+    if data is None:
+        contest = get_object_or_404(Contest, id=id)
+        data = {
+            'contest_status': contest.status,
+            'timer': None,
+        }
         if contest.status == ContestStatus.ACTIVE:
-            data['timer'] = str(finish - now_time).split('.')[0]
-        else:
-            contest.status = ContestStatus.ACTIVE
-            data['contest_status'] = 'active'
-            data['alert_action'] = 1
-            data['alert_message'] = 'Соревнование началось'
-
-    if finish < now_time:
+            data['timer'] = str(max(contest.get_finish_time() - timezone.now(),
+                                    datetime.timedelta())).split('.')[0]
         if contest.status == ContestStatus.FINISHED:
-            pass
-        else:
-            contest.status = ContestStatus.FINISHED
-            data['contest_status'] = 'finished'
-            data['alert_action'] = 2
-            data['alert_message'] = 'Соревнование закончилось'
             data['timer'] = 'Время вышло'
-
-    contest.save()
-    return JsonResponse(data, status=200)
-
-
-def update_contest_solutions(request, id):
-    class TableElement:
-        def __init__(self):
-            self.color = None
-            self.percent = None
-            self.verdict_text = None
-            self.value = None
-            self.status = None
-
-    color = (
-        '#FFFF00',
-        '#EEFF00',
-        '#DDFF00',
-        '#CCFF00',
-        '#BBFF00',
-        '#AAFF00',
-        '#99FF00',
-        '#88FF00',
-        '#77FF00',
-        '#66FF00',
-        '#55FF00',
-        '#44FF00',
-        '#33FF00',
-        '#22FF00',
-        '#11FF00',
-        '#00FF00',
-        '#00FF11',
-    )
-
-    contest = Contest.objects.get(id=id)
-    user = request.user
-    solutions = ContestSolution.objects.filter(
-        participant__user=user,
-        participant__contest=contest,
-    )
-    task = None
-    n = len(solutions)
-    if n > 0:
-        task = solutions[0].task
-    test_count = task.tests.count()
-    table = [[0, 0, 0, 0, 0] for _ in range(n)]
-    for i, s in enumerate(solutions):
-        cur_test = s.cur_test
-        t_c = s.task.tests.count()
-        percent = f'{int((cur_test / t_c) * 100)}'
-        table[i][1] = percent
-        cur_color = color[(len(color) - 1) * int(percent) // 100]
-        table[i][2] = s.verdict_text
-        table[i][4] = s.status
+        cache.set(cache_key, data, settings.CONTEST_CONDITION_CACHE_TIMEOUT)
+
+    response = JsonResponse(data, status=200)
+    patch_cache_control(response, public=True, max_age=settings.CONTEST_CONDITION_CACHE_TIMEOUT)
+    return response
+
+
+SOLUTION_PROGRESS_COLORS = (
+    '#FFFF00',
+    '#EEFF00',
+    '#DDFF00',
+    '#CCFF00',
+    '#BBFF00',
+    '#AAFF00',
+    '#99FF00',
+    '#88FF00',
+    '#77FF00',
+    '#66FF00',
+    '#55FF00',
+    '#44FF00',
+    '#33FF00',
+    '#22FF00',
+    '#11FF00',
+    '#00FF00',
+    '#00FF11',
+)
+
+
+def get_contest_solution_rows(solutions):
+    rows = []
+    for s in solutions.annotate(test_count=Count('task__tests')):
+        percent = int(s.cur_test / s.test_count * 100) if s.test_count else 0
+        percent = min(percent, 100)
+        cur_color = SOLUTION_PROGRESS_COLORS[(len(SOLUTION_PROGRESS_COLORS) - 1) * percent // 100]
+        status_html = ''
         if s.status == Status.QUEUED:
-            table[i][3] = 'В очереди'
+            status_html = 'В очереди'
         if s.status == Status.IN_PROGRESS:
-            table[i][3] = f'<div class="progress" style="width: 120px">\
-                                <div class="progress-bar" role="progressbar" style="width: {table[i][1]}%; background-color: {cur_color}"\
+            status_html = f'<div class="progress" style="width: 120px">\
+                                <div class="progress-bar" role="progressbar" style="width: {percent}%; background-color: {cur_color}"\
                                      aria-valuenow="75" aria-valuemin="0" aria-valuemax="100"></div>\
                             </div>'
         elif s.status == Status.WAIT_FOR_CHECK:
-            table[i][3] = f'<div class="spinner-border" role="status" style="width: 20px; height: 20px">\
+            status_html = f'<div class="spinner-border" role="status" style="width: 20px; height: 20px">\
                                 <span class="sr-only"></span>\
                             </div>'
         elif s.status == Status.CHECK_FAILED:
-            table[i][3] = f'<i class="bi bi-x-square" style="color: #ff5945"></i>'
+            status_html = f'<i class="bi bi-x-square" style="color: #ff5945"></i>'
         elif s.status == Status.CHECK_SUCCESS:
-            table[i][3] = f'<i class="bi bi-check-square" style="color: #56ff20"></i>'
+            status_html = f'<i class="bi bi-check-square" style="color: #56ff20"></i>'
+        rows.append({
+            'id': s.id,
+            'percent': percent,
+            'verdict_text': s.verdict_text,
+            'status_html': status_html,
+            'status': s.status,
+        })
+    return rows
+
+
+def update_contest_solutions(request, id):
+    contest = get_object_or_404(Contest, id=id)
+    solutions = ContestSolution.objects.filter(
+        participant__user=request.user,
+        participant__contest=contest,
+    )
+    return JsonResponse(data={'table': get_contest_solution_rows(solutions)}, status=200)
+
+
+def get_contest_solutions_state(solutions):
+    # one aggregate instead of the rows, versions only grow, so their sum changes with any solution
+    state = solutions.aggregate(
+        count=Count('id'),
+        versions=Sum('version'),
+        unfinished=Count('id', filter=~Q(status__in=(Status.CHECK_SUCCESS, Status.CHECK_FAILED))),
+    )
+    return f'{state["count"]}-{state["versions"] or 0}', state['unfinished']
 
-    return JsonResponse(data={'table': table}, status=200)
+
+def stream_contest_solutions(request, id):
+    # Long poll over server-sent events: the response ends on the first change and the browser reconnects
+    # with the state it has seen. Each open solution list holds a server thread for up to
+    # SOLUTION_STREAM_TIMEOUT, see the settings.
+    contest = get_object_or_404(Contest, id=id)
+    solutions = ContestSolution.objects.filter(
+        participant__user=request.user,
+        participant__contest=contest,
+    )
+
+    def events():
+        seen = request.headers.get('Last-Event-ID')
+        deadline = time.monotonic() + settings.SOLUTION_STREAM_TIMEOUT
+        while True:
+            state, unfinished = get_contest_solutions_state(solutions)
+            if state != seen:
+                for row in get_contest_solution_rows(solutions):
+                    yield f'event: solution\ndata: {json.dumps(row)}\n\n'
+                # a message without data only sets the id the browser sends back when it reconnects
+                reconnect_delay = int(settings.SOLUTION_STREAM_RECONNECT_DELAY * 1000)
+                yield f'id: {state}\nretry: {reconnect_delay}\n\n'
+            if not unfinished:
+                # nothing is checked now, so the client closes the stream until the next submit
+                yield 'event: done\ndata: {}\n\n'
+                return
+            if state != seen or time.monotonic() > deadline:
+                return
+            time.sleep(settings.SOLUTION_STREAM_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class ContestParticipantDescriptionView(ContestParticipantMixin):
@@ -1713,7 +1703,7 @@ class CourseTaskSendSolutionFormHandle(FormView):
             file, code, code_file = None, None, None
             if cd['code'] and not cd['file']:
                 code = cd['code']
-                file_name = f'{str(uuid.uuid4())}.{lang_extension[form.cleaned_data["language"]]}'
+                file_name = f'{str(uuid.uuid4())}.{get_toolchain(form.cleaned_data["language"]).extension}'
                 file__ = open(f'media/raw_code/{file_name}', 'w')
                 file__.write(code)
                 file__.close()
@@ -1778,16 +1768,23 @@ class ContestStudentListView(ListView):
         return qs.filter(course=get_object_or_404(Course, slug=self.kwargs.get('slug', None)))
 
 
-class ChannelListViewMain(ListView):
+class ChannelListViewMain(KeysetPaginationMixin, ListView):
     model = Channel
     template_name = 'channel/channel_list.html'
+    paginate_by = 30
 
 
-class CourseListViewMain(ListView):
+class CourseListViewMain(KeysetPaginationMixin, ListView):
     model = Course
     template_name = 'course/course_list.html'
+    keyset_ordering = ('-created', '-id')
+
+    def get_queryset(self):
+        # hidden courses would leave gaps in the pages
+        return super().get_queryset().filter(show_course_in_channel_page=True)
 
 
-class ContestListViewMain(ListView):
+class ContestListViewMain(KeysetPaginationMixin, ListView):
     model = Contest
     template_name = 'contest/contest_list.html'
+    keyset_ordering = ('-start_time', '-id')
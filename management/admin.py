@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import AbstractTask, CodeFile, Test, Solution
+from .models import AbstractTask, CodeFile, Test, Solution, TestResult, ResourceUsageBucket, VerdictCache
 
 
 @admin.register(AbstractTask)
@@ -21,3 +21,19 @@ class TestAdmin(admin.ModelAdmin):
 @admin.register(Solution)
 class SolutionAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(TestResult)
+class TestResultAdmin(admin.ModelAdmin):
+    list_display = ('solution', 'number', 'verdict', 'time_ms', 'memory_kb')
+
+
+@admin.register(ResourceUsageBucket)
+class ResourceUsageBucketAdmin(admin.ModelAdmin):
+    list_display = ('task', 'language', 'metric', 'bucket', 'count')
+    list_filter = ('metric', 'language')
+
+
+@admin.register(VerdictCache)
+class VerdictCacheAdmin(admin.ModelAdmin):
+    list_display = ('task', 'language', 'tests_version', 'verdict')
@@ -1,8 +1,8 @@
 from django import forms
 
-from .models import Language
+from .toolchains import get_language_choices
 
 
 class SolutionForm(forms.Form):
     file = forms.FileField()
-    language = forms.ChoiceField(choices=Language.choices)
+    language = forms.ChoiceField(choices=get_language_choices)
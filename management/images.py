@@ -0,0 +1,128 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+WEBP = 'webp'
+ORIGINAL = 'original'
+# formats of the derivatives, the original one is kept for browsers without WebP
+
+derivative_storage = FileSystemStorage()
+# derivatives keep the names made from their originals, the default storage would name them by their contents
+
+_pool = None
+
+
+def get_derivative_name(name, width, image_format=WEBP):
+    base, extension = os.path.splitext(name)
+    if image_format == WEBP:
+        extension = '.webp'
+    return f'{DERIVATIVES_DIR}/{base}.{width}{extension}'
+
+
+def encode(image, image_format, extension):
+    output = BytesIO()
+    if image_format == WEBP:
+        image.save(output, 'WEBP', quality=settings.IMAGE_DERIVATIVE_QUALITY, method=4)
+    else:
+        pil_format = Image.registered_extensions().get(extension.lower(), 'PNG')
+        if pil_format == 'JPEG':
+            image.convert('RGB').save(output, pil_format, quality=settings.IMAGE_DERIVATIVE_QUALITY, optimize=True)
+        else:
+            image.save(output, pil_format, optimize=True)
+    return output.getvalue()
+
+
+def make_derivatives(storage, name):
+    # file names are hashes of the contents, so existing derivatives are up to date
+    missing = [(width, image_format) for width in settings.IMAGE_DERIVATIVE_WIDTHS for image_format in (WEBP, ORIGINAL)
+               if not derivative_storage.exists(get_derivative_name(name, width, image_format))]
+    if not missing:
+        return 0
+
+    extension = os.path.splitext(name)[1]
+    with storage.open(name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    variants = {}
+    for width, image_format in missing:
+        if width not in variants:
+            variants[width] = image.copy()
+            # smaller images are only converted, they are never scaled up
+            variants[width].thumbnail((width, width * 4), Image.LANCZOS)
+        derivative_name = get_derivative_name(name, width, image_format)
+        derivative_storage.save(derivative_name, ContentFile(encode(variants[width], image_format, extension)))
+    return len(missing)
+
+
+def make_derivatives_safely(storage, name, on_made=None):
+    made = 0
+    try:
+        made = make_derivatives(storage, name)
+        if made and on_made is not None:
+            on_made()
+    except Exception:
+        logger.exception('Derivatives of image %s were not made', name)
+    finally:
+        # worker threads open their own database connections when on_made uses it
+        connection.close()
+    return made
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # Pillow releases the GIL while it resizes and encodes, so threads are enough
+        _pool = ThreadPoolExecutor(max_workers=settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix='images')
+    return _pool
+
+
+def schedule_derivatives(image, on_made=None):
+    if not image:
+        return
+    storage, name = image.storage, image.name
+    # the file and the row are only there for other requests after the commit
+    transaction.on_commit(lambda: get_pool().submit(make_derivatives_safely, storage, name, on_made))
+
+
+image_fields = []
+# (model, field names, on_made) of the images with derivatives
+
+
+def register_image_fields(model, *field_names, on_made=None):
+    # on_made(pk) is called once new derivatives of an instance are made
+    image_fields.append((model, field_names, on_made))
+
+    def make_image_derivatives(sender, instance, **kwargs):
+        for field_name in field_names:
+            schedule_derivatives(getattr(instance, field_name),
+                                 partial(on_made, instance.pk) if on_made is not None else None)
+
+    post_save.connect(make_image_derivatives, sender=model, weak=False,
+                      dispatch_uid=f'image_derivatives_{model._meta.label_lower}')
+
+
+def get_derivative_url(image, width, image_format=WEBP):
+    # the smallest derivative at least as wide as asked for, the original while they are being made
+    if not image:
+        return ''
+    widths = [size for size in settings.IMAGE_DERIVATIVE_WIDTHS if size >= width]
+    if widths:
+        derivative_name = get_derivative_name(image.name, widths[0], image_format)
+        if derivative_storage.exists(derivative_name):
+            return derivative_storage.url(derivative_name)
+    return image.url
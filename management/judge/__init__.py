@@ -0,0 +1,8 @@
+def init_judge_process(test_workers=1):
+    # spawned judge processes unpickle this before any model is imported
+    import django
+    django.setup()
+
+    from .sandbox import get_sandbox_pool
+    # sandboxes are ready before the first solution arrives
+    get_sandbox_pool(test_workers)
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+class CompileCache:
+    # Built artifacts stored by hash of (code, language, compiler call). Entries are directories,
+    # their modification time is the last use, the least recently used ones are removed first.
+
+    def __init__(self, root, max_size_megabytes):
+        self.root = root
+        self.max_size = max_size_megabytes * 1024 * 1024
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def get_key(code, language, build_args):
+        key = hashlib.sha256()
+        for part in (code, language, '\0'.join(build_args)):
+            key.update(part.encode('utf-8'))
+            key.update(b'\0')
+        return key.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.root, key)
+
+    def fetch(self, key, work_dir):
+        path = self.get_path(key)
+        try:
+            names = os.listdir(path)
+        except FileNotFoundError:
+            return False
+        copied = []
+        try:
+            for name in names:
+                copied.append(name)
+                shutil.copy2(os.path.join(path, name), os.path.join(work_dir, name))
+        except OSError:
+            # the entry was evicted by another judge process meanwhile, the code is compiled again
+            for name in copied:
+                try:
+                    os.remove(os.path.join(work_dir, name))
+                except FileNotFoundError:
+                    pass
+            return False
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def store(self, key, work_dir, artifacts):
+        path = self.get_path(key)
+        if os.path.exists(path):
+            return
+        # entry is built aside and renamed, so other judge processes never see a half written one
+        tmp_path = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        for name in artifacts:
+            shutil.copy2(os.path.join(work_dir, name), os.path.join(tmp_path, name))
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.tmp-'):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+            except FileNotFoundError:
+                continue
+            total_size += size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            self.remove(path)
+            total_size -= size
+
+    def remove(self, path):
+        # entry is renamed aside first, so it disappears at once for other judge processes
+        trash = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            os.rename(path, os.path.join(trash, 'entry'))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(trash, ignore_errors=True)
@@ -0,0 +1,96 @@
+import itertools
+import math
+
+from django.conf import settings
+
+from management.models import TaskAnswerType
+
+CHUNK_SIZE = 64 * 1024
+FLOAT_LENGTH_SLACK = 32
+# numbers within the tolerance may be printed with more digits than the answer has
+
+
+def iter_tokens(file, chunk_size=CHUNK_SIZE, get_max_length=None, current=None):
+    # Whitespace separated tokens. A token that continues in the next chunk is kept as a list of pieces joined
+    # once at its end. As soon as it is longer than get_max_length() allows, reading stops with an empty token,
+    # which doesn't match any token of an answer.
+    # The tokens yielded from the last chunk are kept in current[0].
+    partial = []
+    partial_length = 0
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        tokens = chunk.split()
+        if partial and not chunk[:1].isspace():
+            piece = tokens.pop(0)
+            partial.append(piece)
+            partial_length += len(piece)
+            if not tokens and not chunk[-1:].isspace():
+                if get_max_length is not None and partial_length > get_max_length():
+                    yield b''
+                    return
+                continue
+        if partial:
+            tokens.insert(0, b''.join(partial))
+            partial = []
+        if tokens and not chunk[-1:].isspace():
+            partial.append(tokens.pop())
+        partial_length = len(partial[0]) if partial else 0
+        if current is not None:
+            current[0] = tokens
+        yield from tokens
+    if partial:
+        tokens = [b''.join(partial)]
+        if current is not None:
+            current[0] = tokens
+        yield from tokens
+
+
+def parse_float(token):
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def tokens_equal(output, answer):
+    return output == answer
+
+
+def tokens_close(output, answer):
+    if output == answer:
+        return True
+    output_value, answer_value = parse_float(output), parse_float(answer)
+    if output_value is None or answer_value is None:
+        return False
+    tolerance = settings.JUDGE_FLOAT_TOLERANCE
+    return math.isclose(output_value, answer_value, rel_tol=tolerance, abs_tol=tolerance)
+
+
+COMPARATORS = {
+    TaskAnswerType.CONSTANT_ANSWER: tokens_equal,
+    TaskAnswerType.VARIABLE_ANSWER: tokens_close,
+}
+
+
+def check_output(output_path, answer_path, answer_type):
+    compare = COMPARATORS.get(answer_type, tokens_equal)
+    slack = FLOAT_LENGTH_SLACK if compare is tokens_close else 0
+    answer_chunk = [[]]
+    missing = object()
+
+    def get_max_length():
+        # an answer token is read before the output token compared with it, so the output ends early at a token
+        # longer than any answer token around
+        return max(map(len, answer_chunk[0]), default=0) + slack
+
+    with open(output_path, 'rb') as output, open(answer_path, 'rb') as answer:
+        answer_tokens = iter_tokens(answer, current=answer_chunk)
+        output_tokens = iter_tokens(output, get_max_length=get_max_length)
+        for answer_token, output_token in itertools.zip_longest(answer_tokens, output_tokens, fillvalue=missing):
+            # the rest of the output isn't read after the first mismatch
+            if output_token is missing or answer_token is missing or not compare(output_token, answer_token):
+                return False
+    return True
@@ -0,0 +1,52 @@
+# Launcher for Python 3 solutions. Runs with the solutions' interpreter, imports the modules given
+# on the command line once and forks per test, the child runs the solution in place of exec, so
+# the interpreter start isn't paid by every test. Code of a solution is only ever executed in a
+# forked child, which exits after the run, so nothing of it is left for the next solution.
+import os
+import runpy
+import sys
+import traceback
+
+import launcher
+
+
+def get_exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_child(request):
+    code = 1
+    try:
+        launcher.setup_child(request)
+        # standard streams are opened again on the new descriptors 0, 1 and 2
+        sys.stdin = open(0, encoding='utf-8', closefd=False)
+        sys.stdout = open(1, 'w', encoding='utf-8', closefd=False)
+        sys.stderr = open(2, 'w', encoding='utf-8', closefd=False)
+        sys.argv = request['args'][1:]
+        sys.path[0] = os.getcwd()
+        if 'random' in sys.modules:
+            # otherwise every child would repeat the sequence seeded in the server
+            sys.modules['random'].seed()
+        try:
+            runpy.run_path(sys.argv[0], run_name='__main__')
+            code = 0
+        except SystemExit as exit:
+            code = get_exit_code(exit.code)
+        except BaseException:
+            traceback.print_exc()
+        sys.stdout.flush()
+    except BaseException:
+        code = 1
+    finally:
+        os._exit(code)
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:]:
+        __import__(name)
+    launcher.serve(sys.stdin, sys.stdout, run_child)
@@ -0,0 +1,110 @@
+# Runs solutions on behalf of a judge process. Started once per sandbox and kept alive between
+# runs: reads a JSON request per line, forks, applies the limits and executes the program in the
+# child, answers with {"pid": ...} once the child exists and with the used resources once it exits.
+# Only the standard library is imported, so the memory the child inherits stays small.
+import json
+import os
+import resource
+import signal
+import sys
+
+PR_SET_CHILD_SUBREAPER = 36
+
+
+def setup_child(request):
+    os.setsid()
+    os.chdir(request['cwd'])
+    stdin = os.open(request['stdin'], os.O_RDONLY)
+    stdout = os.open(request['stdout'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(stdin, 0)
+    os.dup2(stdout, 1)
+    os.dup2(devnull, 2)
+    os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+    for name, soft, hard in request['limits']:
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+    if request['user'] is not None:
+        # the files are opened and the limits are set while the child may still do it
+        uid, gid = request['user']
+        os.setgroups([])
+        os.setgid(gid)
+        os.setuid(uid)
+    os.environ.clear()
+    os.environ.update(request['env'])
+
+
+def run_child(request):
+    try:
+        setup_child(request)
+        os.execvpe(request['args'][0], request['args'], request['env'])
+    finally:
+        os._exit(127)
+
+
+def set_child_subreaper():
+    # processes left by their parents are moved under the launcher instead of init, so the judge finds them
+    import ctypes
+    ctypes.CDLL(None).prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0)
+
+
+def get_children():
+    children = []
+    parent = str(os.getpid()).encode()
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as stat:
+                data = stat.read()
+        except OSError:
+            continue
+        if data[data.rindex(b')') + 2:].split()[1] == parent:
+            children.append(int(name))
+    return children
+
+
+def kill_children():
+    # children of a killed process are moved under the launcher in turn
+    while True:
+        children = get_children()
+        if not children:
+            return
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+def serve(requests, responses, run_child=run_child):
+    set_child_subreaper()
+    for line in requests:
+        request = json.loads(line)
+        pid = os.fork()
+        if pid == 0:
+            run_child(request)
+
+        responses.write(json.dumps({'pid': pid}) + '\n')
+        responses.flush()
+        _, status, usage = os.wait4(pid, 0)
+        try:
+            # processes the solution started and left behind
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        kill_children()
+        responses.write(json.dumps({
+            'exit_code': os.waitstatus_to_exitcode(status),
+            'time_ms': int((usage.ru_utime + usage.ru_stime) * 1000),
+            'memory_kb': usage.ru_maxrss,
+        }) + '\n')
+        responses.flush()
+
+
+if __name__ == '__main__':
+    serve(sys.stdin, sys.stdout)
@@ -0,0 +1,168 @@
+import math
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+
+from management.models import Verdict
+
+PAGE_SIZE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+class RunResult:
+    def __init__(self, exit_code, time_ms, wall_ms, memory_kb, killed_by_timer, killed_by_memory_watcher=False):
+        self.exit_code = exit_code
+        # negative value is the number of the signal which killed the process
+        self.time_ms = time_ms
+        # user + system CPU time
+        self.wall_ms = wall_ms
+        self.memory_kb = memory_kb
+        # peak resident set size, of all processes of the solution together when they were watched
+        self.killed_by_timer = killed_by_timer
+        self.killed_by_memory_watcher = killed_by_memory_watcher
+
+    def get_verdict(self, time_limit_seconds, memory_limit_megabytes):
+        if self.killed_by_timer or self.time_ms > time_limit_seconds * 1000 \
+                or self.exit_code == -signal.SIGXCPU:
+            return Verdict.TIME_LIMIT_ERROR
+        if self.killed_by_memory_watcher or self.memory_kb > memory_limit_megabytes * 1024:
+            return Verdict.MEMORY_LIMIT_ERROR
+        if self.exit_code != 0:
+            return Verdict.RUNTIME_ERROR
+        return None
+
+
+def kill_process_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def kill_process(pid):
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def get_descendants(root_pid):
+    # {pid: resident set in KB} of all processes below root_pid, found by their parents in /proc
+    children = defaultdict(list)
+    rss_kb = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as stat:
+                data = stat.read()
+        except OSError:
+            # the process has already exited
+            continue
+        # the command name in parentheses may contain spaces
+        fields = data[data.rindex(b')') + 2:].split()
+        pid = int(name)
+        children[int(fields[1])].append(pid)
+        rss_kb[pid] = int(fields[21]) * PAGE_SIZE_KB
+
+    descendants = {}
+    parents = [root_pid]
+    while parents:
+        for pid in children.get(parents.pop(), ()):
+            descendants[pid] = rss_kb[pid]
+            parents.append(pid)
+    return descendants
+
+
+@lru_cache(maxsize=None)
+def get_limits(time_limit_seconds, memory_limit_megabytes):
+    # computed once per set of task limits and applied by the launcher; memory is watched by run_process,
+    # the address space limit only stops a single process long before it could use up the node
+    cpu_limit = int(math.ceil(time_limit_seconds)) + 1
+    output_limit = settings.JUDGE_OUTPUT_LIMIT_MEGABYTES * 1024 * 1024
+    address_space = (memory_limit_megabytes + settings.JUDGE_ADDRESS_SPACE_HEADROOM_MEGABYTES) * 1024 * 1024
+    return [
+        ('RLIMIT_CPU', cpu_limit, cpu_limit + 1),
+        ('RLIMIT_FSIZE', output_limit, output_limit),
+        ('RLIMIT_CORE', 0, 0),
+        ('RLIMIT_NPROC', settings.JUDGE_PROCESS_LIMIT, settings.JUDGE_PROCESS_LIMIT),
+        ('RLIMIT_AS', address_space, address_space),
+    ]
+
+
+def run_process(launcher, args, cwd, stdin_path, stdout_path, time_limit_seconds, memory_limit_megabytes,
+                on_start=None):
+    wall_limit = time_limit_seconds * settings.JUDGE_WALL_TIME_FACTOR + 1
+    started = time.monotonic()
+    pid = launcher.start(args, cwd, stdin_path, stdout_path, get_limits(time_limit_seconds, memory_limit_megabytes))
+    if on_start is not None:
+        # the callback may kill the process group, e.g. when the run is no longer needed
+        on_start(pid)
+
+    killed = threading.Event()
+    finished = threading.Event()
+    memory_exceeded = threading.Event()
+    peak_memory_kb = 0
+
+    def kill():
+        killed.set()
+        kill_process_group(pid)
+
+    def watch_memory():
+        # Resident sets of all processes of the solution are added up while it runs, so it is killed soon after
+        # they go over the limit. Processes left by their parents are moved under the launcher, which is their
+        # subreaper, so all of them are below it.
+        nonlocal peak_memory_kb
+        while not finished.wait(settings.JUDGE_MEMORY_POLL_INTERVAL):
+            processes = get_descendants(launcher.pid)
+            peak_memory_kb = max(peak_memory_kb, sum(processes.values()))
+            if peak_memory_kb > memory_limit_megabytes * 1024:
+                memory_exceeded.set()
+                kill_process_group(pid)
+                for process in processes:
+                    kill_process(process)
+                return
+
+    timer = threading.Timer(wall_limit, kill)
+    timer.start()
+    watcher = threading.Thread(target=watch_memory, daemon=True)
+    watcher.start()
+    try:
+        result = launcher.wait()
+    finally:
+        timer.cancel()
+        finished.set()
+        watcher.join()
+
+    return RunResult(
+        exit_code=result['exit_code'],
+        time_ms=result['time_ms'],
+        wall_ms=int((time.monotonic() - started) * 1000),
+        memory_kb=max(result['memory_kb'], peak_memory_kb),
+        killed_by_timer=killed.is_set(),
+        killed_by_memory_watcher=memory_exceeded.is_set(),
+    )
+
+
+def compile_source(args, cwd):
+    try:
+        result = subprocess.run(
+            args,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            timeout=settings.JUDGE_COMPILE_TIMEOUT,
+            # messages of the compiler are shown to the author, e.g. of #include "/proc/self/environ"
+            env=settings.JUDGE_SOLUTION_ENVIRONMENT,
+        )
+    except subprocess.TimeoutExpired:
+        return False, 'Превышено время компиляции'
+    except FileNotFoundError:
+        return False, f'Компилятор {args[0]} не найден'
+    return result.returncode == 0, result.stdout.decode('utf-8', errors='replace')
@@ -0,0 +1,190 @@
+import atexit
+import json
+import os
+import pwd
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+
+LAUNCHER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'launcher.py')
+FORK_SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fork_server.py')
+
+
+class LauncherError(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def get_solution_user():
+    # (uid, gid) solutions run as, None when they run as the judge's user
+    if settings.JUDGE_SOLUTION_USER is None:
+        return None
+    user = pwd.getpwnam(settings.JUDGE_SOLUTION_USER)
+    return user.pw_uid, user.pw_gid
+
+
+class Launcher:
+    # Warm launcher process with pipes opened in advance, runs one program at a time.
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=True,
+            universal_newlines=True,
+            # a solution could read the environment of the launcher it was forked from
+            env=settings.JUDGE_SOLUTION_ENVIRONMENT,
+        )
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def _read(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise LauncherError(f'Launcher {self.process.pid} exited with code {self.process.poll()}')
+        return json.loads(line)
+
+    def start(self, args, cwd, stdin_path, stdout_path, limits):
+        self.process.stdin.write(json.dumps({
+            'args': args,
+            'cwd': cwd,
+            'stdin': stdin_path,
+            'stdout': stdout_path,
+            'limits': limits,
+            'user': get_solution_user(),
+            'env': settings.JUDGE_SOLUTION_ENVIRONMENT,
+        }) + '\n')
+        self.process.stdin.flush()
+        return self._read()['pid']
+
+    def wait(self):
+        return self._read()
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+def get_launcher_command(interpreter=None):
+    if interpreter is None:
+        return sys.executable, '-S', LAUNCHER_PATH
+    # fork server of a Python interpreter, runs the solution in a forked copy of itself
+    return (*interpreter, FORK_SERVER_PATH, *settings.JUDGE_PYTHON_PRELOAD_MODULES)
+
+
+class Sandbox:
+    # Working directory with its own launchers, cleaned and reused by the next solution.
+
+    def __init__(self, root, launchers=1):
+        self.path = tempfile.mkdtemp(dir=root, prefix='sandbox-')
+        user = get_solution_user()
+        if user is not None:
+            # solutions may write files next to their code
+            os.chown(self.path, *user)
+        self.idle_launchers = defaultdict(queue.SimpleQueue)
+        command = get_launcher_command()
+        for _ in range(launchers):
+            self.idle_launchers[command].put(Launcher(command))
+
+    @contextmanager
+    def launcher(self, interpreter=None):
+        # tests running at the same time each take a launcher, new ones are started when needed
+        command = get_launcher_command(interpreter)
+        try:
+            launcher = self.idle_launchers[command].get_nowait()
+        except queue.Empty:
+            launcher = Launcher(command)
+        try:
+            yield launcher
+        finally:
+            if launcher.alive:
+                self.idle_launchers[command].put(launcher)
+            else:
+                launcher.close()
+
+    def get_launchers(self):
+        launchers = []
+        for command, idle in self.idle_launchers.items():
+            while True:
+                try:
+                    launchers.append((command, idle.get_nowait()))
+                except queue.Empty:
+                    break
+        return launchers
+
+    def clean(self):
+        for entry in os.scandir(self.path):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+        launchers = self.get_launchers()
+        for command, launcher in launchers:
+            self.idle_launchers[command].put(launcher)
+        # a sandbox is only reused when nothing of the previous solution is left in it
+        return not os.listdir(self.path) and bool(launchers) \
+            and all(launcher.alive for _, launcher in launchers)
+
+    def close(self):
+        for _, launcher in self.get_launchers():
+            launcher.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class SandboxPool:
+    def __init__(self, root, size, launchers):
+        self.root = root
+        self.size = size
+        self.launchers = launchers
+        self.idle = [self.create() for _ in range(size)]
+
+    def create(self):
+        return Sandbox(self.root, self.launchers)
+
+    @contextmanager
+    def sandbox(self):
+        sandbox = self.idle.pop() if self.idle else self.create()
+        try:
+            yield sandbox
+        finally:
+            if len(self.idle) < self.size and sandbox.clean():
+                self.idle.append(sandbox)
+            else:
+                sandbox.close()
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+_pool = None
+
+
+def get_sandbox_pool(launchers=1):
+    # one pool per judge process, solutions in a process are judged one by one
+    global _pool
+    if _pool is None:
+        root = settings.JUDGE_WORK_DIR or tempfile.gettempdir()
+        _pool = SandboxPool(root, settings.JUDGE_SANDBOX_POOL_SIZE, launchers)
+        atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,549 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+import multiprocessing
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from management.models import Solution, Status, Verdict, SolutionEventType, TaskGradingSystem, TestResult, \
+    ResourceMetric, ResourceUsageBucket, VerdictCache, QueuePriority
+from management.toolchains import get_toolchain, prepare_toolchains
+from . import init_judge_process
+from .cache import CompileCache
+from .checker import check_output
+from .runner import run_process, compile_source, kill_process_group
+from .sandbox import get_sandbox_pool
+
+logger = logging.getLogger(__name__)
+
+JUDGE_DEFAULT_TEST_WORKERS = 4
+
+VERDICT_TEXT = {
+    Verdict.BUILD_FAILED: 'Ошибка компиляции',
+    Verdict.RUNTIME_ERROR: 'Ошибка выполнения',
+    Verdict.TIME_LIMIT_ERROR: 'Превышено ограничение времени',
+    Verdict.MEMORY_LIMIT_ERROR: 'Превышено ограничение памяти',
+    Verdict.WRONG_ANSWER: 'Неправильный ответ',
+    Verdict.PARTIAL_SOLUTION: 'Частичное решение',
+    Verdict.CORRECT_SOLUTION: 'Решение верное',
+}
+
+
+class TestOutcome:
+    def __init__(self, test, verdict, run=None, output_path=None, result=None, answer_changed=False):
+        self.test = test
+        self.verdict = verdict
+        # None means the test is passed
+        self.run = run
+        self.output_path = output_path
+        self.result = result
+        # stored result of an unchanged test, such a test isn't run again
+        self.answer_changed = answer_changed
+
+    @classmethod
+    def from_result(cls, test, result):
+        verdict = None if result.verdict == Verdict.CORRECT_SOLUTION else result.verdict
+        return cls(test, verdict, result=result)
+
+    @property
+    def passed(self):
+        return self.verdict is None
+
+
+class TestCancellation:
+    # Tests after the first failed one, used when the remaining tests can't change the outcome.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.first_failed = None
+        self.processes = {}
+
+    def is_cancelled(self, number):
+        return self.first_failed is not None and number > self.first_failed
+
+    def register(self, number, pid):
+        with self.lock:
+            self.processes[number] = pid
+            if self.is_cancelled(number):
+                kill_process_group(pid)
+
+    def unregister(self, number):
+        with self.lock:
+            self.processes.pop(number, None)
+
+    def fail(self, number):
+        with self.lock:
+            if self.first_failed is not None and self.first_failed < number:
+                return
+            self.first_failed = number
+            for running, pid in self.processes.items():
+                if running > number:
+                    kill_process_group(pid)
+
+
+def stops_on_failure(solution):
+    # author validations run every test to fill in the answers
+    return solution.event_type == SolutionEventType.USER_TASK_SOLUTION \
+        and solution.task.grading_system == TaskGradingSystem.BINARY
+
+
+def pick_fairly(candidates, limit):
+    # round robin between authors inside a priority: an author's n-th waiting solution
+    # goes after the first n - 1 solutions of everybody else
+    queued = defaultdict(int)
+    ranked = []
+    for solution_id, author_id, priority, created in candidates:
+        ranked.append((priority, queued[priority, author_id], created, solution_id))
+        queued[priority, author_id] += 1
+    return [solution_id for *_, solution_id in sorted(ranked)[:limit]]
+
+
+def get_first_of_each_author(waiting):
+    # ids of the first JUDGE_CLAIM_PER_AUTHOR waiting solutions of every author in each priority, so one author
+    # with many submissions can't fill the whole claim window; Django can't filter by a window function,
+    # so the ranked rows are wrapped in a subquery
+    ranked = waiting.order_by().annotate(author_rank=Window(
+        RowNumber(),
+        partition_by=[F('priority'), F('author_id')],
+        order_by=[F('created').asc(), F('id').asc()],
+    )).values_list('id', 'author_rank')
+    sql, params = ranked.query.sql_with_params()
+    return RawSQL(f'SELECT ranked.id FROM ({sql}) ranked WHERE ranked.author_rank <= %s',
+                  (*params, settings.JUDGE_CLAIM_PER_AUTHOR))
+
+
+def claim_solutions(node, limit, languages=None):
+    waiting = Solution.objects.filter(status=Status.WAIT_FOR_CHECK).exclude(
+        # authors usually edit a task several times in a row, their validations are merged meanwhile
+        event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
+        created__gt=timezone.now() - timedelta(seconds=settings.JUDGE_VALIDATION_DELAY),
+    )
+    if languages is not None:
+        # solutions in languages missing on this node are left for other nodes
+        waiting = waiting.filter(code_file__language__in=languages)
+    with transaction.atomic():
+        candidates = list(
+            waiting.filter(id__in=get_first_of_each_author(waiting)).select_for_update(
+                skip_locked=True, of=('self',),
+            ).order_by('priority', 'created').values_list(
+                'id', 'author_id', 'priority', 'created',
+            )[:settings.JUDGE_CLAIM_WINDOW]
+        )
+        ids = pick_fairly(candidates, limit)
+        if ids:
+            Solution.objects.filter(id__in=ids).update(
+                status=Status.QUEUED,
+                node=node,
+                claimed=timezone.now(),
+                version=F('version') + 1,
+            )
+    return ids
+
+
+def release_solutions(node):
+    # solutions left by a previous run of the worker on this node
+    return Solution.objects.filter(
+        node=node,
+        status__in=(Status.QUEUED, Status.IN_PROGRESS),
+    ).update(
+        status=Status.WAIT_FOR_CHECK,
+        cur_test=0,
+        version=F('version') + 1,
+    )
+
+
+def get_compile_cache():
+    if settings.JUDGE_COMPILE_CACHE_DIR is None:
+        return None
+    return CompileCache(settings.JUDGE_COMPILE_CACHE_DIR, settings.JUDGE_COMPILE_CACHE_SIZE_MEGABYTES)
+
+
+def build_solution(toolchain, code_file, work_dir):
+    build = toolchain.get_build_command()
+    cache = get_compile_cache()
+    if cache is not None:
+        key = CompileCache.get_key(code_file.code, code_file.language, build)
+        if cache.fetch(key, work_dir):
+            return True, ''
+
+    sources = set(os.listdir(work_dir))
+    success, message = compile_source(build, work_dir)
+    if success and cache is not None:
+        artifacts = [name for name in os.listdir(work_dir)
+                     if name not in sources and os.path.isfile(os.path.join(work_dir, name))]
+        cache.store(key, work_dir, artifacts)
+    return success, message
+
+
+def run_test(solution, toolchain, sandbox, number, test, cancellation=None):
+    task = solution.task
+    output_path = os.path.join(sandbox.path, f'{number}.out')
+    time_limit = toolchain.get_time_limit(task.time_limit_seconds)
+    memory_limit = toolchain.get_memory_limit(task.memory_limit_megabytes)
+    if cancellation is not None and cancellation.is_cancelled(number):
+        return None
+
+    with sandbox.launcher(toolchain.fork_server) as launcher:
+        run = run_process(
+            launcher,
+            toolchain.run,
+            cwd=sandbox.path,
+            stdin_path=test.get_input_path(),
+            stdout_path=output_path,
+            time_limit_seconds=time_limit,
+            memory_limit_megabytes=memory_limit,
+            on_start=partial(cancellation.register, number) if cancellation is not None else None,
+        )
+    if cancellation is not None:
+        cancellation.unregister(number)
+        if cancellation.is_cancelled(number):
+            return None
+
+    verdict = run.get_verdict(time_limit, memory_limit)
+    if verdict is None and solution.event_type == SolutionEventType.AUTHOR_TASK_VALIDATION:
+        # the output becomes the answer here, so the result is saved with the hash of it
+        answer_hash = test.answer_hash
+        test.set_answer_file(output_path)
+        return TestOutcome(test, verdict, run, test.get_answer_path(), answer_changed=test.answer_hash != answer_hash)
+    if verdict is None and solution.event_type == SolutionEventType.USER_TASK_SOLUTION:
+        if not check_output(output_path, test.get_answer_path(), task.answer_type):
+            verdict = Verdict.WRONG_ANSWER
+    return TestOutcome(test, verdict, run, output_path)
+
+
+def grade(grading_system, outcomes):
+    # skipped tests are None, they are only left after a failure with binary grading
+    passed = [outcome for outcome in outcomes if outcome is not None and outcome.passed]
+    failed = [(number, outcome) for number, outcome in enumerate(outcomes, 1)
+              if outcome is not None and not outcome.passed]
+
+    if not failed:
+        verdict, text = Verdict.CORRECT_SOLUTION, VERDICT_TEXT[Verdict.CORRECT_SOLUTION]
+    else:
+        number, outcome = failed[0]
+        verdict, text = outcome.verdict, f'{VERDICT_TEXT[outcome.verdict]} на тесте {number}'
+        if passed and grading_system != TaskGradingSystem.BINARY:
+            verdict = Verdict.PARTIAL_SOLUTION
+            text = f'{VERDICT_TEXT[Verdict.PARTIAL_SOLUTION]}: пройдено {len(passed)} из {len(outcomes)} тестов'
+
+    if grading_system == TaskGradingSystem.BINARY:
+        points = 0 if failed else 1
+    elif grading_system == TaskGradingSystem.BINARY_FOR_EACH_TEST:
+        points = len(passed)
+    else:
+        points = sum(outcome.test.max_points for outcome in passed)
+    return verdict, text, points
+
+
+def finish_solution(solution, verdict, verdict_text, points=0):
+    solution.verdict = verdict
+    solution.verdict_text = verdict_text
+    solution.points = points
+    solution.status = Status.CHECK_SUCCESS if verdict == Verdict.CORRECT_SOLUTION else Status.CHECK_FAILED
+    solution.save()
+
+
+def save_validation(solution, outcomes):
+    task = solution.task
+    for outcome in outcomes:
+        # saving a test changes the tests version, so unchanged answers are left alone
+        if outcome.answer_changed:
+            outcome.test.save()
+    task.refresh_from_db(fields=['tests_version'])
+    task.is_validated = all(outcome.passed for outcome in outcomes)
+    update_fields = ['is_validated']
+
+    # validations after changes of the statement leave the tests as they were, the solutions are judged again
+    # only after a change of the tests or of the limits, and only the changed tests are run for them
+    if task.is_validated and task.tests_version != task.judged_tests_version:
+        Solution.objects.filter(
+            task_id=task.id,
+            event_type=SolutionEventType.USER_TASK_SOLUTION,
+            status__in=(Status.CHECK_SUCCESS, Status.CHECK_FAILED),
+        ).exclude(verdict=Verdict.BUILD_FAILED).rejudge(reuse_test_results=True)
+        task.judged_tests_version = task.tests_version
+        update_fields.append('judged_tests_version')
+    task.save(update_fields=update_fields)
+
+
+def read_output_preview(output_path):
+    try:
+        with open(output_path, 'rb') as output:
+            return output.read(settings.JUDGE_TEST_OUTPUT_PREVIEW).decode('utf-8', errors='replace')
+    except FileNotFoundError:
+        return ''
+
+
+def make_test_result(solution, number, outcome):
+    test = outcome.test
+    if outcome.result is not None:
+        # results are written again, numbers of the tests may have changed
+        result = outcome.result
+        return TestResult(
+            solution=solution,
+            test=test,
+            number=number,
+            verdict=result.verdict,
+            time_ms=result.time_ms,
+            memory_kb=result.memory_kb,
+            exit_code=result.exit_code,
+            output=result.output,
+            input_hash=result.input_hash,
+            answer_hash=result.answer_hash,
+        )
+
+    run = outcome.run
+    return TestResult(
+        solution=solution,
+        test=test,
+        number=number,
+        verdict=Verdict.CORRECT_SOLUTION if outcome.passed else outcome.verdict,
+        time_ms=run.time_ms,
+        memory_kb=run.memory_kb,
+        exit_code=run.exit_code,
+        output=read_output_preview(outcome.output_path),
+        input_hash=test.input_hash,
+        answer_hash=test.answer_hash,
+    )
+
+
+def save_progress(solution, results):
+    TestResult.objects.bulk_create(results)
+    results.clear()
+    solution.save(update_fields=['cur_test'])
+
+
+def record_resource_usage(solution, outcomes):
+    runs = [outcome.run for outcome in outcomes if outcome is not None and outcome.run is not None]
+    ResourceUsageBucket.record(solution.task_id, solution.code_file.language, {
+        ResourceMetric.TIME: [run.time_ms for run in runs],
+        ResourceMetric.MEMORY: [run.memory_kb for run in runs],
+    })
+
+
+def get_reused_outcomes(tests, reusable):
+    outcomes = [None] * len(tests)
+    for index, test in enumerate(tests):
+        result = reusable.get(test.id)
+        if result is not None:
+            outcomes[index] = TestOutcome.from_result(test, result)
+    return outcomes
+
+
+def get_saved_time_ms(outcomes, cancellation):
+    # estimated by the tests run this time, reused results of unchanged tests weren't run and aren't saved
+    if cancellation is None or cancellation.first_failed is None:
+        return 0
+    finished = [outcome.run.wall_ms for outcome in outcomes if outcome is not None and outcome.run is not None]
+    skipped = sum(1 for number, outcome in enumerate(outcomes, 1)
+                  if outcome is None and cancellation.is_cancelled(number))
+    return sum(finished) * skipped // len(finished) if finished else 0
+
+
+def run_tests(solution, toolchain, sandbox, tests, test_workers, reusable):
+    outcomes = get_reused_outcomes(tests, reusable)
+    cancellation = TestCancellation() if stops_on_failure(solution) else None
+    results = [make_test_result(solution, index + 1, outcome)
+               for index, outcome in enumerate(outcomes) if outcome is not None]
+    if cancellation is not None:
+        failed = [index + 1 for index, outcome in enumerate(outcomes) if outcome is not None and not outcome.passed]
+        if failed:
+            cancellation.fail(failed[0])
+    solution.cur_test = reused = len(results)
+    started = saved = time.monotonic()
+    # tests only run processes and read files, the database is used by this thread alone
+    with ThreadPoolExecutor(max_workers=test_workers) as pool:
+        futures = {
+            pool.submit(run_test, solution, toolchain, sandbox, number, test, cancellation): number - 1
+            for number, test in enumerate(tests, 1) if outcomes[number - 1] is None
+        }
+        for completed, future in enumerate(as_completed(futures), reused + 1):
+            # outcomes keep the order of tests, so the first failed test doesn't depend on timing
+            index = futures[future]
+            outcome = outcomes[index] = future.result()
+            if outcome is not None:
+                results.append(make_test_result(solution, index + 1, outcome))
+                if cancellation is not None and not outcome.passed:
+                    cancellation.fail(index + 1)
+            solution.cur_test = completed
+
+            # results and progress are written in batches, not on every test
+            if len(results) >= settings.JUDGE_TEST_RESULT_BATCH \
+                    or time.monotonic() - saved >= settings.JUDGE_PROGRESS_INTERVAL:
+                save_progress(solution, results)
+                saved = time.monotonic()
+    TestResult.objects.bulk_create(results)
+
+    solution.judge_time_ms = int((time.monotonic() - started) * 1000)
+    record_resource_usage(solution, outcomes)
+    solution.saved_time_ms = get_saved_time_ms(outcomes, cancellation)
+    return outcomes
+
+
+def grade_solution(solution, outcomes):
+    if solution.event_type == SolutionEventType.AUTHOR_TASK_VALIDATION:
+        save_validation(solution, outcomes)
+        # author's solution defines the answers, so it's only checked for limits and errors
+        return grade(TaskGradingSystem.BINARY, outcomes)
+    return grade(solution.task.grading_system, outcomes)
+
+
+def run_solution(solution, tests, test_workers, reusable):
+    if all(test.id in reusable for test in tests):
+        # none of the tests has changed, the solution is only graded again
+        outcomes = run_tests(solution, None, None, tests, test_workers, reusable)
+        return grade_solution(solution, outcomes)
+
+    toolchain = get_toolchain(solution.code_file.language)
+    with get_sandbox_pool(test_workers).sandbox() as sandbox:
+        work_dir = sandbox.path
+        with open(os.path.join(work_dir, toolchain.source), 'w') as source:
+            source.write(solution.code_file.code)
+
+        if toolchain.build:
+            success, message = build_solution(toolchain, solution.code_file, work_dir)
+            if not success:
+                return Verdict.BUILD_FAILED, f'{VERDICT_TEXT[Verdict.BUILD_FAILED]}\n{message}', 0
+
+        outcomes = run_tests(solution, toolchain, sandbox, tests, test_workers, reusable)
+        return grade_solution(solution, outcomes)
+
+
+def get_cache_lookup(solution, tests_version):
+    code_file = solution.code_file
+    return {
+        'task_id': solution.task_id,
+        'code_hash': code_file.code_hash or code_file.get_code_hash(),
+        'language': code_file.language,
+        'tests_version': tests_version,
+    }
+
+
+def get_reusable_results(solution, tests):
+    if solution.event_type == SolutionEventType.AUTHOR_TASK_VALIDATION:
+        # answers are made from the inputs, so the last validation of the same code covers the unchanged ones
+        code_file = solution.code_file
+        previous = Solution.objects.filter(
+            task_id=solution.task_id,
+            event_type=SolutionEventType.AUTHOR_TASK_VALIDATION,
+            code_file__code_hash=code_file.code_hash or code_file.get_code_hash(),
+            code_file__language=code_file.language,
+            status__in=(Status.CHECK_SUCCESS, Status.CHECK_FAILED),
+        ).exclude(pk=solution.pk).order_by('-created').first()
+        results = list(previous.test_results.all()) if previous is not None else []
+    elif solution.reuse_test_results:
+        results = list(solution.test_results.all())
+    else:
+        return {}
+
+    tests = {test.id: test for test in tests}
+    return {
+        result.test_id: result for result in results
+        if result.test_id in tests and result.input_hash
+        and (result.input_hash, result.answer_hash) == (tests[result.test_id].input_hash,
+                                                        tests[result.test_id].answer_hash)
+    }
+
+
+def judge_solution(solution_id, test_workers=1):
+    solution = Solution.objects.select_related('task', 'code_file').get(pk=solution_id)
+    tests_version = solution.task.tests_version
+    use_cache = solution.event_type == SolutionEventType.USER_TASK_SOLUTION
+    # a rejudge is asked for when a verdict is doubted, so it doesn't trust the cache
+    rejudge = solution.priority == QueuePriority.REJUDGE
+
+    if use_cache and not rejudge:
+        cached = VerdictCache.objects.filter(**get_cache_lookup(solution, tests_version)).first()
+        if cached is not None:
+            solution.cur_test = cached.cur_test
+            solution.judge_time_ms = solution.saved_time_ms = 0
+            finish_solution(solution, cached.verdict, cached.verdict_text, cached.points)
+            return
+
+    tests = list(solution.task.tests.all())
+    for test in tests:
+        test.ensure_files()
+    reusable = get_reusable_results(solution, tests)
+    # results of a previous judging of the solution, the reused ones are written again
+    solution.test_results.all().delete()
+    solution.status = Status.IN_PROGRESS
+    solution.cur_test = 0
+    solution.reuse_test_results = False
+    solution.save()
+
+    finish_solution(solution, *run_solution(solution, tests, test_workers, reusable))
+
+    # time limit verdicts depend on the load of the node, so they are judged again
+    if use_cache and solution.verdict != Verdict.TIME_LIMIT_ERROR:
+        store = VerdictCache.objects.update_or_create if rejudge else VerdictCache.objects.get_or_create
+        store(
+            **get_cache_lookup(solution, tests_version),
+            defaults={
+                'verdict': solution.verdict,
+                'verdict_text': solution.verdict_text,
+                'points': solution.points,
+                'cur_test': solution.cur_test,
+            },
+        )
+
+
+def judge_solution_safely(solution_id, test_workers=1):
+    try:
+        judge_solution(solution_id, test_workers)
+    except Exception:
+        logger.exception('Solution %s was not judged', solution_id)
+        Solution.objects.filter(pk=solution_id).update(
+            status=Status.CHECK_FAILED,
+            verdict_text='Ошибка проверяющей системы',
+            version=F('version') + 1,
+        )
+        raise
+
+
+class JudgeWorker:
+    def __init__(self, node, workers=None, poll_interval=None, test_workers=None):
+        self.node = node
+        cpu_count = os.cpu_count() or 1
+        # the CPUs are shared by fewer solutions so that the tests of each run in parallel
+        self.test_workers = test_workers or settings.JUDGE_TEST_WORKERS or min(cpu_count, JUDGE_DEFAULT_TEST_WORKERS)
+        self.workers = workers or settings.JUDGE_WORKERS or max(cpu_count // self.test_workers, 1)
+        self.poll_interval = poll_interval or settings.JUDGE_POLL_INTERVAL
+        self.languages = None
+        # filled with the languages passing their probes when the worker starts
+
+    def run(self):
+        self.languages = prepare_toolchains()
+        logger.info('Languages available on node %s: %s', self.node, ', '.join(self.languages))
+        released = release_solutions(self.node)
+        if released:
+            logger.info('Returned %s unfinished solutions to the queue', released)
+
+        # spawned processes open their own database connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                 initializer=init_judge_process, initargs=(self.test_workers,)) as pool:
+            running = set()
+            while True:
+                free = self.workers - len(running)
+                if free > 0:
+                    for solution_id in claim_solutions(self.node, free, self.languages):
+                        running.add(pool.submit(judge_solution_safely, solution_id, self.test_workers))
+
+                if not running:
+                    time.sleep(self.poll_interval)
+                    continue
+
+                done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        logger.error('Judge process failed: %s', future.exception())
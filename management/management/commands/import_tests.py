@@ -0,0 +1,44 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from management.models import AbstractTask, Test
+from management.storage import test_storage
+
+
+class Command(BaseCommand):
+    help = 'Adds tests to a task from <name>.in files (and optional <name>.out answers) of a directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('task_id', type=int)
+        parser.add_argument('directory')
+
+    def handle(self, *args, **options):
+        try:
+            task = AbstractTask.objects.get(pk=options['task_id'])
+        except AbstractTask.DoesNotExist:
+            raise CommandError(f'Task {options["task_id"]} does not exist')
+
+        names = sorted(name[:-3] for name in os.listdir(options['directory']) if name.endswith('.in'))
+        for name in names:
+            test = Test(task=task)
+            # files are streamed into the storage, large tests are never read into memory
+            test.input_hash, test.input_size = test_storage.save_file(
+                os.path.join(options['directory'], f'{name}.in'))
+            answer_path = os.path.join(options['directory'], f'{name}.out')
+            if os.path.exists(answer_path):
+                test.answer_hash, test.answer_size = test_storage.save_file(answer_path)
+            test.content = self.read_inline(test.input_hash, test.input_size)
+            test.right_answer = self.read_inline(test.answer_hash, test.answer_size)
+            test.save()
+            self.stdout.write(f'Test {name}: {test.input_size} bytes')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {len(names)} tests'))
+
+    @staticmethod
+    def read_inline(file_hash, size):
+        if not file_hash or size > settings.TEST_INLINE_LIMIT:
+            return ''
+        with open(test_storage.get_path(file_hash), encoding='utf-8', errors='replace') as file:
+            return file.read()
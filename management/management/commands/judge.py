@@ -0,0 +1,35 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from management.judge.worker import JudgeWorker
+
+
+class Command(BaseCommand):
+    help = 'Runs the judge worker which checks solutions waiting in the queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--node', type=int, default=settings.JUDGE_NODE,
+                            help='Number of this judge box, written to the claimed solutions')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of solutions judged at the same time (CPU count by default)')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds between queue checks when the worker is idle')
+        parser.add_argument('--test-workers', type=int, default=None,
+                            help='Number of tests of one solution run at the same time')
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+        worker = JudgeWorker(
+            node=options['node'],
+            workers=options['workers'],
+            poll_interval=options['poll_interval'],
+            test_workers=options['test_workers'],
+        )
+        self.stdout.write(f'Judge worker started on node {worker.node} with {worker.workers} processes, '
+                          f'{worker.test_workers} tests each')
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            self.stdout.write('Judge worker stopped')
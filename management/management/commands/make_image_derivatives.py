@@ -0,0 +1,30 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from management.images import image_fields, get_pool, make_derivatives_safely
+
+
+class Command(BaseCommand):
+    help = 'Makes the missing smaller and WebP copies of uploaded images'
+
+    def handle(self, *args, **options):
+        storages = {}
+        callbacks = defaultdict(list)
+        for model, field_names, on_made in image_fields:
+            for pk, *names in model.objects.values_list('pk', *field_names):
+                for field_name, name in zip(field_names, names):
+                    if not name:
+                        continue
+                    storages[name] = model._meta.get_field(field_name).storage
+                    if on_made is not None:
+                        callbacks[name].append((on_made, pk))
+
+        names = list(storages)
+        made = list(get_pool().map(lambda name: make_derivatives_safely(storages[name], name), names))
+        for name, count in zip(names, made):
+            if count:
+                for on_made, pk in callbacks[name]:
+                    on_made(pk)
+
+        self.stdout.write(self.style.SUCCESS(f'Made {sum(made)} derivatives of {len(names)} images'))
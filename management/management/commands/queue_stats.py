@@ -0,0 +1,47 @@
+import datetime
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from management.models import QueuePriority, Solution, Status
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, percent):
+    # nearest rank, values are sorted
+    index = max((len(values) * percent + 99) // 100 - 1, 0)
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Shows the judge queue length and percentiles of the time solutions waited in it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=1,
+                            help='Solutions claimed during this many last hours are counted')
+
+    def handle(self, *args, **options):
+        waiting = dict(
+            Solution.objects.filter(status=Status.WAIT_FOR_CHECK).order_by().values_list(
+                'priority').annotate(count=Count('id'))
+        )
+        since = timezone.now() - datetime.timedelta(hours=options['hours'])
+        waits = defaultdict(list)
+        for priority, created, enqueued, claimed in Solution.objects.filter(claimed__gte=since).order_by().values_list(
+                'priority', 'created', 'enqueued', 'claimed').iterator():
+            # rejudged solutions wait from the rejudge, not from the submission
+            waits[priority].append(max((claimed - (enqueued or created)).total_seconds(), 0))
+
+        header = ' '.join(f'p{percent:<7}' for percent in PERCENTILES)
+        self.stdout.write(f'{"priority":<20} {"waiting":>8} {"claimed":>8}  {header}')
+        for priority in QueuePriority:
+            values = sorted(waits[priority])
+            if values:
+                row = ' '.join(f'{percentile(values, percent):<8.2f}' for percent in PERCENTILES)
+            else:
+                row = ' '.join(f'{"-":<8}' for _ in PERCENTILES)
+            self.stdout.write(f'{str(priority.label):<20} {waiting.get(priority, 0):>8} {len(values):>8}  {row}')
+        self.stdout.write('Wait times are in seconds')
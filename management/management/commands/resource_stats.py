@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from management.models import AbstractTask, ResourceMetric, ResourceUsageBucket
+from management.toolchains import get_language_label
+
+PERCENTS = (50, 95, 99)
+
+
+class Command(BaseCommand):
+    help = 'Shows percentiles of CPU time and peak memory of test runs per task and per language'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', type=int, action='append', dest='tasks',
+                            help='Show only these tasks, may be repeated')
+
+    def format_row(self, title, filters, limits=None):
+        columns = []
+        for metric in ResourceMetric:
+            runs, percentiles = ResourceUsageBucket.get_percentiles(metric, PERCENTS, **filters)
+            for percent in PERCENTS:
+                value = percentiles.get(percent)
+                cell = '-' if value is None else str(value)
+                if value is not None and limits is not None:
+                    # share of the task limit, shows how much room the limit leaves
+                    cell += f' ({value * 100 // limits[metric]}%)'
+                columns.append(f'{cell:<14}')
+        return f'{title[:30]:<30} {runs:>8}  ' + ''.join(columns)
+
+    def handle(self, *args, **options):
+        header = ''.join(f'{f"{metric.name.lower()} p{percent}":<14}' for metric in ResourceMetric for percent in PERCENTS)
+        self.stdout.write(f'{"":<30} {"runs":>8}  {header}')
+
+        task_ids = ResourceUsageBucket.objects.order_by('task_id').values_list('task_id', flat=True).distinct()
+        if options['tasks']:
+            task_ids = task_ids.filter(task_id__in=options['tasks'])
+        for task in AbstractTask.objects.filter(id__in=task_ids).order_by('id'):
+            limits = {
+                ResourceMetric.TIME: task.time_limit_seconds * 1000,
+                ResourceMetric.MEMORY: task.memory_limit_megabytes * 1024,
+            }
+            self.stdout.write(self.format_row(f'{task.id} {task.title}', {'task': task}, limits))
+
+        self.stdout.write('')
+        filters = {'task_id__in': task_ids} if options['tasks'] else {}
+        languages = ResourceUsageBucket.objects.filter(**filters).order_by('language').values('language').annotate(
+            runs=Sum('count'))
+        for row in languages:
+            self.stdout.write(self.format_row(get_language_label(row['language']), {'language': row['language'], **filters}))
+        self.stdout.write('Time is in milliseconds, memory in kilobytes')
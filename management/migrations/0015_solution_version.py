@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2021-06-03 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0014_auto_20210520_1805'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.3 on 2021-06-04 11:20
+
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_code_hash(apps, schema_editor):
+    CodeFile = apps.get_model('management', 'CodeFile')
+    for code_file in CodeFile.objects.only('id', 'code').iterator():
+        code_hash = hashlib.sha256(code_file.code.encode('utf-8')).hexdigest()
+        CodeFile.objects.filter(pk=code_file.pk).update(code_hash=code_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0015_solution_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abstracttask',
+            name='tests_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='codefile',
+            name='code_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.RunPython(fill_code_hash, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='VerdictCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code_hash', models.CharField(max_length=64)),
+                ('language', models.TextField(choices=[('ASM', 'GNU Assembly Language'), ('C99', 'GNU GCC C99'), ('C11', 'GNU GCC C11'), ('C++11', 'GNU G++ C++ 11'), ('C++14', 'GNU G++ C++ 14'), ('C++17', 'GNU G++ C++ 17'), ('C++20', 'GNU G++ C++ 20'), ('Python2', 'Python v2.7'), ('Python3', 'Python v3.9.4'), ('Java8', 'Java 8')])),
+                ('tests_version', models.PositiveIntegerField()),
+                ('verdict', models.TextField(choices=[('NO VERDICT', 'No verdict'), ('WRONG FILE FORMAT', 'Wrong format of file'), ('FILE TOO BIG', 'File has too large size'), ('BUILD FAILED', 'Build failed'), ('RUNTIME ERROR', 'Runtime error'), ('TIME LIMIT ERROR', 'Time limit error'), ('MEMORY LIMIT ERROR', 'Memory limit error'), ('WRONG ANSWER', 'Wrong answer'), ('PARTIAL SOLUTION', 'Partial solution'), ('CORRECT SOLUTION', 'Correct solution')])),
+                ('verdict_text', models.TextField(blank=True)),
+                ('points', models.IntegerField(default=0)),
+                ('cur_test', models.IntegerField(default=0)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cached_verdicts', to='management.abstracttask')),
+            ],
+            options={
+                'unique_together': {('task', 'code_hash', 'language', 'tests_version')},
+            },
+        ),
+    ]
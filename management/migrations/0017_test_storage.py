@@ -0,0 +1,38 @@
+# Generated by Django 3.2.3 on 2021-06-05 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0016_verdictcache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='test',
+            name='content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='input_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='input_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='answer_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='answer_size',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
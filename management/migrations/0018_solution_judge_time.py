@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2021-06-05 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0017_test_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='judge_time_ms',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='saved_time_ms',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
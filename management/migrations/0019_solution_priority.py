@@ -0,0 +1,33 @@
+# Generated by Django 3.2.3 on 2021-06-06 12:15
+
+from django.db import migrations, models
+
+
+def fill_validation_priority(apps, schema_editor):
+    Solution = apps.get_model('management', 'Solution')
+    Solution.objects.filter(event_type='TASK_VALIDATION').update(priority=2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0018_solution_judge_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='priority',
+            field=models.IntegerField(choices=[(0, 'Contest solution'), (1, 'Practice solution'), (2, 'Task validation')], default=1),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='solution',
+            index=models.Index(fields=['status', 'priority', 'created'], name='management__status_a0fb8a_idx'),
+        ),
+        migrations.RunPython(fill_validation_priority, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.3 on 2021-06-06 16:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0019_solution_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('verdict', models.TextField(choices=[('NO VERDICT', 'No verdict'), ('WRONG FILE FORMAT', 'Wrong format of file'), ('FILE TOO BIG', 'File has too large size'), ('BUILD FAILED', 'Build failed'), ('RUNTIME ERROR', 'Runtime error'), ('TIME LIMIT ERROR', 'Time limit error'), ('MEMORY LIMIT ERROR', 'Memory limit error'), ('WRONG ANSWER', 'Wrong answer'), ('PARTIAL SOLUTION', 'Partial solution'), ('CORRECT SOLUTION', 'Correct solution')])),
+                ('time_ms', models.PositiveIntegerField(default=0)),
+                ('memory_kb', models.PositiveIntegerField(default=0)),
+                ('exit_code', models.IntegerField(default=0)),
+                ('output', models.TextField(blank=True)),
+                ('solution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to='management.solution')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='management.test')),
+            ],
+            options={
+                'ordering': ('solution', 'number'),
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2021-06-06 20:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0020_testresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceUsageBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.TextField(choices=[('ASM', 'GNU Assembly Language'), ('C99', 'GNU GCC C99'), ('C11', 'GNU GCC C11'), ('C++11', 'GNU G++ C++ 11'), ('C++14', 'GNU G++ C++ 14'), ('C++17', 'GNU G++ C++ 17'), ('C++20', 'GNU G++ C++ 20'), ('Python2', 'Python v2.7'), ('Python3', 'Python v3.9.4'), ('Java8', 'Java 8')])),
+                ('metric', models.TextField(choices=[('TIME', 'CPU time, ms'), ('MEMORY', 'Peak memory, KB')])),
+                ('bucket', models.IntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_usage', to='management.abstracttask')),
+            ],
+            options={
+                'unique_together': {('task', 'language', 'metric', 'bucket')},
+            },
+        ),
+    ]
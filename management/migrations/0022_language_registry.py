@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2021-06-07 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0021_resourceusagebucket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='codefile',
+            name='language',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='resourceusagebucket',
+            name='language',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='verdictcache',
+            name='language',
+            field=models.TextField(),
+        ),
+    ]
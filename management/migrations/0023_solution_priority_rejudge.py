@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2021-06-07 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0022_language_registry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='solution',
+            name='priority',
+            field=models.IntegerField(choices=[(0, 'Contest solution'), (1, 'Practice solution'), (2, 'Task validation'), (3, 'Rejudge')], default=1),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2021-06-08 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0023_solution_priority_rejudge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='reuse_test_results',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='answer_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='testresult',
+            name='input_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
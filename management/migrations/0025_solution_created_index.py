@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2021-06-10 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0024_testresult_test_hashes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solution',
+            index=models.Index(fields=['created', 'id'], name='management__created_9565c8_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.3 on 2021-06-11 10:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_judged_tests_version(apps, schema_editor):
+    AbstractTask = apps.get_model('management', 'AbstractTask')
+    AbstractTask.objects.update(judged_tests_version=F('tests_version'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0025_solution_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='abstracttask',
+            name='judged_tests_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_judged_tests_version, migrations.RunPython.noop),
+    ]
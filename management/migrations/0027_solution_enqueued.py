@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2021-06-11 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0026_abstracttask_judged_tests_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='enqueued',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.3 on 2021-06-11 17:30
+
+import hashlib
+
+from django.db import migrations
+from django.db.models import Q
+
+
+def fill_test_hashes(apps, schema_editor):
+    # tests created before the test storage; the files are written by the judge when it first runs them,
+    # the hashes are the same as the storage gives them
+    Test = apps.get_model('management', 'Test')
+    batch = []
+    for test in Test.objects.filter(Q(input_hash='') | Q(answer_hash='')).only('content', 'right_answer').iterator():
+        content, right_answer = test.content.encode('utf-8'), test.right_answer.encode('utf-8')
+        test.input_hash, test.input_size = hashlib.sha256(content).hexdigest(), len(content)
+        test.answer_hash, test.answer_size = hashlib.sha256(right_answer).hexdigest(), len(right_answer)
+        batch.append(test)
+        if len(batch) >= 500:
+            Test.objects.bulk_update(batch, ['input_hash', 'input_size', 'answer_hash', 'answer_size'])
+            batch = []
+    if batch:
+        Test.objects.bulk_update(batch, ['input_hash', 'input_size', 'answer_hash', 'answer_size'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0027_solution_enqueued'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_test_hashes, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,17 @@
+import hashlib
+import math
+from collections import Counter
 from datetime import datetime
 
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .storage import test_storage
+
 
 class TaskAnswerType(models.TextChoices):
     CONSTANT_ANSWER = 'CA', _('Constant answer')
@@ -26,33 +34,6 @@ class TaskGradingSystem(models.TextChoices):
     N_POINTS_FOR_EACH_TEST = 'POINTS TEST', _('N points for each test')
 
 
-class Language(models.TextChoices):
-    GNU_ASM = 'ASM', _('GNU Assembly Language')
-    GNU_C99 = 'C99', _('GNU GCC C99')
-    GNU_C11 = 'C11', _('GNU GCC C11')
-    GNU_CXX_11 = 'C++11', _('GNU G++ C++ 11')
-    GNU_CXX_14 = 'C++14', _('GNU G++ C++ 14')
-    GNU_CXX_17 = 'C++17', _('GNU G++ C++ 17')
-    GNU_CXX_20 = 'C++20', _('GNU G++ C++ 20')
-    PYTHON_2_7 = 'Python2', _('Python v2.7')
-    PYTHON_3_9 = 'Python3', _('Python v3.9.4')
-    JAVA_8 = 'Java8', _('Java 8')
-
-
-lang_extension = {
-    'ASM': 's',
-    'C99': 'c',
-    'C11': 'c',
-    'C++11': 'cpp',
-    'C++14': 'cpp',
-    'C++17': 'cpp',
-    'C++20': 'cpp',
-    'Python2': 'py',
-    'Python3': 'py',
-    'Java8': 'java',
-}
-
-
 class Status(models.TextChoices):
     WAIT_FOR_CHECK = 'WAIT', _('Ожидается проверка')
     QUEUED = 'QUEUED', _('В очереди')
@@ -61,6 +42,19 @@ class Status(models.TextChoices):
     CHECK_SUCCESS = 'SUCCESS', _('Проверка пройдена')
 
 
+class ResourceMetric(models.TextChoices):
+    TIME = 'TIME', _('CPU time, ms')
+    MEMORY = 'MEMORY', _('Peak memory, KB')
+
+
+class QueuePriority(models.IntegerChoices):
+    # solutions with a smaller value are judged first
+    CONTEST = 0, _('Contest solution')
+    PRACTICE = 1, _('Practice solution')
+    VALIDATION = 2, _('Task validation')
+    REJUDGE = 3, _('Rejudge')
+
+
 class Verdict(models.TextChoices):
     EMPTY_VERDICT = 'NO VERDICT', _('No verdict')
     WRONG_FILE_FORMAT = 'WRONG FILE FORMAT', _('Wrong format of file')
@@ -76,9 +70,19 @@ class Verdict(models.TextChoices):
 
 class CodeFile(models.Model):
     file = models.FileField(upload_to='code/%Y/%m/%d')
-    language = models.TextField(choices=Language.choices)
+    language = models.TextField()
     code = models.TextField(default='')
     file_name = models.CharField(default='', max_length=100)
+    code_hash = models.CharField(default='', max_length=64, db_index=True, blank=True)
+
+    def get_code_hash(self):
+        return hashlib.sha256(self.code.encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.code_hash = self.get_code_hash()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'code_hash'}
+        super().save(*args, **kwargs)
 
 
 class AbstractTask(models.Model):
@@ -103,20 +107,126 @@ class AbstractTask(models.Model):
 
     grading_system = models.TextField(choices=TaskGradingSystem.choices, default=TaskGradingSystem.BINARY)
     is_validated = models.BooleanField(default=False)
+    tests_version = models.PositiveIntegerField(default=0)
+    # incremented on every change of the tests
+    judged_tests_version = models.PositiveIntegerField(default=0)
+    # tests version the solutions of the users were last judged against
+
+    JUDGING_FIELDS = ('time_limit_seconds', 'memory_limit_megabytes', 'answer_type', 'grading_system')
+    # verdicts got before a change of these fields are judged again
+    TEST_RESULT_FIELDS = ('time_limit_seconds', 'memory_limit_megabytes', 'answer_type')
+    # results of single tests depend on these fields
 
     # class Meta:
     #     abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: getattr(instance, name) for name in cls.JUDGING_FIELDS if name in field_names
+        }
+        return instance
+
+    def get_changed_judging_fields(self):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set()
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
+    def save(self, *args, **kwargs):
+        changed = self.get_changed_judging_fields() if self.pk is not None else set()
+        super().save(*args, **kwargs)
+        self._loaded_values = {name: getattr(self, name) for name in self.JUDGING_FIELDS}
+        if not changed:
+            return
+        # cached verdicts are looked up by the tests version, so they are judged again like after a change of tests
+        AbstractTask.objects.filter(pk=self.pk).update(tests_version=F('tests_version') + 1)
+        self.refresh_from_db(fields=['tests_version'])
+        VerdictCache.objects.filter(task_id=self.pk).delete()
+        if changed & set(self.TEST_RESULT_FIELDS):
+            # results got with other limits or checking aren't reused by the next judging
+            TestResult.objects.filter(test__task_id=self.pk).update(input_hash='', answer_hash='')
+
 
 class Test(models.Model):
     task = models.ForeignKey(AbstractTask, on_delete=models.CASCADE, related_name='tests')
-    content = models.TextField()
+    content = models.TextField(blank=True)
     right_answer = models.TextField(blank=True)
     max_points = models.IntegerField(default=1)
 
+    input_hash = models.CharField(max_length=64, blank=True, default='')
+    input_size = models.BigIntegerField(default=0)
+    answer_hash = models.CharField(max_length=64, blank=True, default='')
+    answer_size = models.BigIntegerField(default=0)
+    # tests are judged from the files in the test storage, content and right_answer
+    # keep a copy only for tests not larger than TEST_INLINE_LIMIT
+
     class Meta:
         ordering = ('id',)
 
+    def store_files(self):
+        # empty text of a large test means that the test exists only in the storage
+        if self.content or self.input_size <= settings.TEST_INLINE_LIMIT:
+            self.input_hash, self.input_size = test_storage.save_bytes(self.content.encode('utf-8'))
+        if self.right_answer or self.answer_size <= settings.TEST_INLINE_LIMIT:
+            self.answer_hash, self.answer_size = test_storage.save_bytes(self.right_answer.encode('utf-8'))
+
+    def ensure_files(self):
+        # tests created before the storage or judged on a node without a copy of the files
+        if test_storage.exists(self.input_hash) and test_storage.exists(self.answer_hash):
+            return
+        hashes = self.input_hash, self.answer_hash
+        self.store_files()
+        if (self.input_hash, self.answer_hash) != hashes:
+            # the test itself is the same, so the tests version and the cached verdicts are left alone
+            Test.objects.filter(pk=self.pk).update(
+                input_hash=self.input_hash,
+                input_size=self.input_size,
+                answer_hash=self.answer_hash,
+                answer_size=self.answer_size,
+            )
+
+    def set_answer_file(self, path):
+        self.answer_hash, self.answer_size = test_storage.save_file(path, move=True)
+        if self.answer_size <= settings.TEST_INLINE_LIMIT:
+            with open(test_storage.get_path(self.answer_hash), encoding='utf-8', errors='replace') as answer:
+                self.right_answer = answer.read()
+        else:
+            self.right_answer = ''
+
+    def get_input_path(self):
+        return test_storage.get_path(self.input_hash)
+
+    def get_answer_path(self):
+        return test_storage.get_path(self.answer_hash)
+
+    def save(self, *args, **kwargs):
+        self.store_files()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {
+                'input_hash', 'input_size', 'answer_hash', 'answer_size',
+            }
+        super().save(*args, **kwargs)
+
+
+class SolutionQuerySet(models.QuerySet):
+    def rejudge(self, reuse_test_results=False):
+        # one UPDATE for all rows, scoreboards catch up through signals as the new verdicts are saved
+        return self.update(
+            reuse_test_results=reuse_test_results,
+            status=Status.WAIT_FOR_CHECK,
+            verdict=Verdict.EMPTY_VERDICT,
+            verdict_text='Посылка не проверена',
+            points=0,
+            cur_test=0,
+            judge_time_ms=0,
+            saved_time_ms=0,
+            priority=QueuePriority.REJUDGE,
+            enqueued=timezone.now(),
+            version=F('version') + 1,
+        )
+
 
 class Solution(models.Model):
     author = models.ForeignKey(to=User, on_delete=models.CASCADE,
@@ -146,6 +256,150 @@ class Solution(models.Model):
                                   default=SolutionEventType.USER_TASK_SOLUTION)
     points = models.IntegerField(default=0)
     cur_test = models.IntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    # bumped on every status / cur_test / verdict change, used to push only changed rows
+    judge_time_ms = models.PositiveIntegerField(default=0)
+    # wall clock time spent running the tests
+    saved_time_ms = models.PositiveIntegerField(default=0)
+    # estimated time of the tests skipped after the outcome was decided
+    priority = models.IntegerField(choices=QueuePriority.choices, default=QueuePriority.PRACTICE)
+    claimed = models.DateTimeField(null=True, blank=True)
+    # last time a judge took the solution from the queue
+    enqueued = models.DateTimeField(null=True, blank=True)
+    # last time the solution was put back in the queue by a rejudge, waits are counted from created before that
+    reuse_test_results = models.BooleanField(default=False)
+    # rejudged after a change of tests, results of the unchanged tests are kept
+
+    objects = SolutionQuerySet.as_manager()
+
+    TRACKED_FIELDS = ('status', 'verdict', 'points', 'cur_test')
+    # fields whose changes are reported by get_changed_fields()
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=('status', 'priority', 'created')),
+            models.Index(fields=('created', 'id')),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: getattr(instance, name) for name in cls.TRACKED_FIELDS if name in field_names
+        }
+        return instance
+
+    def get_changed_fields(self):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set(self.TRACKED_FIELDS)
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
+    def get_queue_priority(self):
+        if self.event_type == SolutionEventType.AUTHOR_TASK_VALIDATION:
+            return QueuePriority.VALIDATION
+        return QueuePriority.PRACTICE
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.priority = self.get_queue_priority()
+        if self.pk is not None and {'status', 'cur_test', 'verdict'} & self.get_changed_fields():
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'version'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+
+class TestResult(models.Model):
+    solution = models.ForeignKey(Solution, on_delete=models.CASCADE, related_name='test_results')
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='results')
+    number = models.PositiveIntegerField()
+    verdict = models.TextField(choices=Verdict.choices)
+    time_ms = models.PositiveIntegerField(default=0)
+    memory_kb = models.PositiveIntegerField(default=0)
+    exit_code = models.IntegerField(default=0)
+    output = models.TextField(blank=True)
+    # beginning of the output, at most JUDGE_TEST_OUTPUT_PREVIEW bytes
+    input_hash = models.CharField(max_length=64, blank=True)
+    answer_hash = models.CharField(max_length=64, blank=True)
+    # files of the test the result was got on, a result is reused while they are the same
+
+    class Meta:
+        ordering = ('solution', 'number')
+
+
+class ResourceUsageBucket(models.Model):
+    task = models.ForeignKey(AbstractTask, on_delete=models.CASCADE, related_name='resource_usage')
+    language = models.TextField()
+    metric = models.TextField(choices=ResourceMetric.choices)
+    bucket = models.IntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    # histogram of test runs: bucket n counts values up to BUCKET_BASE ** n, so the error of
+    # a percentile is below 25%; histograms of a task or a language are sums over the other key
+
+    BUCKET_BASE = 1.25
+
+    class Meta:
+        unique_together = ('task', 'language', 'metric', 'bucket')
+
+    @classmethod
+    def get_bucket(cls, value):
+        return math.ceil(math.log(value, cls.BUCKET_BASE)) if value > 1 else 0
+
+    @classmethod
+    def get_bucket_value(cls, bucket):
+        return int(math.ceil(cls.BUCKET_BASE ** bucket))
+
+    @classmethod
+    def record(cls, task_id, language, values):
+        # values is {metric: [value of every test run]}
+        counts = Counter((metric, cls.get_bucket(value)) for metric, metric_values in values.items()
+                         for value in metric_values)
+        for (metric, bucket), count in counts.items():
+            lookup = {'task_id': task_id, 'language': language, 'metric': metric, 'bucket': bucket}
+            if cls.objects.filter(**lookup).update(count=F('count') + count):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(count=count, **lookup)
+            except IntegrityError:
+                # created by another judge process in the meantime
+                cls.objects.filter(**lookup).update(count=F('count') + count)
+
+    @classmethod
+    def get_percentiles(cls, metric, percents=(50, 95, 99), **filters):
+        buckets = list(
+            cls.objects.filter(metric=metric, **filters).order_by('bucket').values_list('bucket').annotate(
+                total=Sum('count'))
+        )
+        runs = sum(count for _, count in buckets)
+        percentiles = {}
+        if not runs:
+            return runs, percentiles
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            for percent in percents:
+                if percent not in percentiles and seen * 100 >= runs * percent:
+                    percentiles[percent] = cls.get_bucket_value(bucket)
+        return runs, percentiles
+
+
+class VerdictCache(models.Model):
+    task = models.ForeignKey(AbstractTask, on_delete=models.CASCADE, related_name='cached_verdicts')
+    code_hash = models.CharField(max_length=64)
+    language = models.TextField()
+    tests_version = models.PositiveIntegerField()
+
+    verdict = models.TextField(choices=Verdict.choices)
+    verdict_text = models.TextField(blank=True)
+    points = models.IntegerField(default=0)
+    cur_test = models.IntegerField(default=0)
+
+    # result of a judged user solution, reused for byte-identical resubmissions
+
+    class Meta:
+        unique_together = ('task', 'code_hash', 'language', 'tests_version')
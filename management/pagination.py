@@ -0,0 +1,106 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise Http404
+
+
+class KeysetPaginationMixin:
+    # Pages start after the last row of the previous page instead of an offset, so every page of a long list
+    # is read with one index range scan. The last field of keyset_ordering must be unique.
+    paginate_by = 50
+    keyset_ordering = ('-id',)
+    after_param = 'after'
+    before_param = 'before'
+
+    def get_keyset_fields(self, queryset):
+        descending = self.keyset_ordering[0].startswith('-')
+        fields = [field.lstrip('-') for field in self.keyset_ordering]
+        return [queryset.model._meta.get_field(field) for field in fields], descending
+
+    def get_keyset_filter(self, fields, values, forward):
+        # (a, b) after (x, y) is a >= x and (a > x or b > y), the first condition keeps the index range narrow
+        field, value = fields[0], values[0]
+        lookup = 'gt' if forward else 'lt'
+        if len(fields) == 1:
+            return Q(**{f'{field.name}__{lookup}': value})
+        return Q(**{f'{field.name}__{lookup}e': value}) & (
+            Q(**{f'{field.name}__{lookup}': value}) | self.get_keyset_filter(fields[1:], values[1:], forward)
+        )
+
+    def get_cursor(self, fields, obj):
+        return encode_cursor([field.value_to_string(obj) for field in fields])
+
+    def parse_cursor(self, fields, cursor):
+        values = decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise Http404
+        try:
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except ValidationError:
+            raise Http404
+
+    def paginate_queryset(self, queryset, page_size):
+        fields, descending = self.get_keyset_fields(queryset)
+        after = self.request.GET.get(self.after_param)
+        before = self.request.GET.get(self.before_param)
+
+        # a previous page is read in the opposite order and turned over
+        forward = before is None
+        ordering = self.keyset_ordering if forward else [
+            field[1:] if field.startswith('-') else f'-{field}' for field in self.keyset_ordering
+        ]
+        queryset = queryset.order_by(*ordering)
+        cursor = after if forward else before
+        if cursor is not None:
+            values = self.parse_cursor(fields, cursor)
+            queryset = queryset.filter(self.get_keyset_filter(fields, values, forward != descending))
+
+        rows = list(queryset[:page_size + 1])
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = more, after is not None
+        else:
+            has_next, has_previous = True, more
+        next_cursor = self.get_cursor(fields, rows[-1]) if rows and has_next else None
+        previous_cursor = self.get_cursor(fields, rows[0]) if rows and has_previous else None
+        page = KeysetPage(rows, next_cursor, previous_cursor)
+        return None, page, rows, page.has_other_pages()
@@ -0,0 +1,13 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import AbstractTask, Test, VerdictCache
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def update_tests_version(sender, instance, **kwargs):
+    AbstractTask.objects.filter(pk=instance.task_id).update(tests_version=F('tests_version') + 1)
+    # verdicts of the previous versions can't be looked up anymore
+    VerdictCache.objects.filter(task_id=instance.task_id).delete()
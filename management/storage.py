@@ -0,0 +1,80 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class TestStorage:
+    # Content-addressed files: every file is stored once under <root>/<hash[:2]>/<hash>.
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_path(self, file_hash):
+        return os.path.join(self.root, file_hash[:2], file_hash)
+
+    def exists(self, file_hash):
+        return bool(file_hash) and os.path.exists(self.get_path(file_hash))
+
+    def _publish(self, tmp_path, file_hash):
+        path = self.get_path(file_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return path
+
+    def _mkstemp(self):
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+
+    def save_bytes(self, data):
+        file_hash = hashlib.sha256(data).hexdigest()
+        if not self.exists(file_hash):
+            fd, tmp_path = self._mkstemp()
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            self._publish(tmp_path, file_hash)
+        return file_hash, len(data)
+
+    def save_stream(self, stream):
+        file_hash = hashlib.sha256()
+        size = 0
+        fd, tmp_path = self._mkstemp()
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                file_hash.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        file_hash = file_hash.hexdigest()
+        self._publish(tmp_path, file_hash)
+        return file_hash, size
+
+    def save_file(self, path, move=False):
+        if not move:
+            with open(path, 'rb') as stream:
+                return self.save_stream(stream)
+
+        file_hash = hashlib.sha256()
+        with open(path, 'rb') as stream:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                file_hash.update(chunk)
+        file_hash = file_hash.hexdigest()
+        size = os.path.getsize(path)
+        if self.exists(file_hash):
+            os.remove(path)
+        else:
+            fd, tmp_path = self._mkstemp()
+            os.close(fd)
+            # the working directory may be on another file system, so it isn't renamed in place
+            shutil.move(path, tmp_path)
+            self._publish(tmp_path, file_hash)
+        return file_hash, size
+
+
+test_storage = TestStorage(settings.TEST_STORAGE_ROOT)
@@ -0,0 +1,11 @@
+from django import template
+
+from management.images import WEBP, get_derivative_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(image, width, image_format=WEBP):
+    # {% image_url course.preview_picture 320 %}, 'original' as the format keeps the format of the upload
+    return get_derivative_url(image, width, image_format)
@@ -1,3 +1,252 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .judge.cache import CompileCache
+from .judge.checker import check_output
+from .judge.runner import RunResult
+from .judge.worker import TestCancellation, TestOutcome, claim_solutions, get_saved_time_ms, grade, pick_fairly
+from .models import AbstractTask, CodeFile, QueuePriority, Solution, Status, TaskAnswerType, TaskGradingSystem, \
+    Test, Verdict
+from .pagination import KeysetPaginationMixin
+from .storage import test_storage
+
+
+class CheckOutputTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def check(self, output, answer, answer_type=TaskAnswerType.CONSTANT_ANSWER):
+        paths = []
+        for name, content in (('output', output), ('answer', answer)):
+            path = os.path.join(self.directory.name, name)
+            with open(path, 'wb') as file:
+                file.write(content)
+            paths.append(path)
+        return check_output(*paths, answer_type)
+
+    def test_whitespace_is_ignored(self):
+        self.assertTrue(self.check(b'1  2\r\n3\n\n', b'1 2 3'))
+        self.assertFalse(self.check(b'1 2 4', b'1 2 3'))
+
+    def test_tokens_across_chunks(self):
+        answer = b'a' * 100000 + b' ' + b'b' * 200000 + b'\n'
+        self.assertTrue(self.check(answer.replace(b'\n', b''), answer))
+        self.assertFalse(self.check(b'a' * 100000 + b' ' + b'b' * 199999 + b'c', answer))
+
+    def test_too_long_token(self):
+        self.assertFalse(self.check(b'1' * (1 << 20), b'1'))
+        self.assertFalse(self.check(b'1 ' + b'2' * (1 << 20), b'1'))
+
+    def test_extra_and_missing_tokens(self):
+        self.assertFalse(self.check(b'1 2 3 4', b'1 2 3'))
+        self.assertFalse(self.check(b'1 2', b'1 2 3'))
+        self.assertFalse(self.check(b'', b'1'))
+        self.assertTrue(self.check(b'\n', b''))
+
+    @override_settings(JUDGE_FLOAT_TOLERANCE=1e-6)
+    def test_float_tolerance(self):
+        self.assertTrue(self.check(b'0.3333333 2.00000000001', b'0.33333333 2', TaskAnswerType.VARIABLE_ANSWER))
+        self.assertFalse(self.check(b'0.3334', b'0.3333', TaskAnswerType.VARIABLE_ANSWER))
+        self.assertFalse(self.check(b'nan', b'1', TaskAnswerType.VARIABLE_ANSWER))
+        self.assertFalse(self.check(b'0.3333333', b'0.33333333'))
+
+
+class GradeTest(SimpleTestCase):
+    def outcomes(self, *verdicts):
+        return [None if verdict == 'skipped' else TestOutcome(Test(max_points=number), verdict)
+                for number, verdict in enumerate(verdicts, 1)]
+
+    def test_binary(self):
+        self.assertEqual(grade(TaskGradingSystem.BINARY, self.outcomes(None, None))[::2],
+                         (Verdict.CORRECT_SOLUTION, 1))
+        verdict, text, points = grade(TaskGradingSystem.BINARY,
+                                      self.outcomes(None, Verdict.WRONG_ANSWER, 'skipped'))
+        self.assertEqual((verdict, points), (Verdict.WRONG_ANSWER, 0))
+        self.assertTrue(text.endswith('на тесте 2'))
+
+    def test_binary_for_each_test(self):
+        verdict, text, points = grade(TaskGradingSystem.BINARY_FOR_EACH_TEST,
+                                      self.outcomes(None, Verdict.TIME_LIMIT_ERROR, None))
+        self.assertEqual((verdict, points), (Verdict.PARTIAL_SOLUTION, 2))
+        self.assertIn('пройдено 2 из 3', text)
+
+    def test_points_for_each_test(self):
+        verdict, text, points = grade(TaskGradingSystem.N_POINTS_FOR_EACH_TEST,
+                                      self.outcomes(Verdict.RUNTIME_ERROR, None, None))
+        self.assertEqual((verdict, points), (Verdict.PARTIAL_SOLUTION, 5))
+        self.assertEqual(grade(TaskGradingSystem.N_POINTS_FOR_EACH_TEST, self.outcomes(None, None, None))[::2],
+                         (Verdict.CORRECT_SOLUTION, 6))
+
+    def test_nothing_passed(self):
+        verdict, text, points = grade(TaskGradingSystem.BINARY_FOR_EACH_TEST,
+                                      self.outcomes(Verdict.WRONG_ANSWER, Verdict.RUNTIME_ERROR))
+        self.assertEqual((verdict, points), (Verdict.WRONG_ANSWER, 0))
+        self.assertTrue(text.endswith('на тесте 1'))
+
+
+class SavedTimeTest(SimpleTestCase):
+    def run_outcome(self, wall_ms, verdict=None):
+        return TestOutcome(Test(), verdict, RunResult(0, wall_ms, wall_ms, 0, False))
+
+    def test_only_cancelled_tests_are_counted(self):
+        reused = TestOutcome(Test(), None)
+        outcomes = [reused, self.run_outcome(100), self.run_outcome(200, Verdict.WRONG_ANSWER), None, None]
+        cancellation = TestCancellation()
+        cancellation.fail(3)
+        self.assertEqual(get_saved_time_ms(outcomes, cancellation), 300)
+
+    def test_nothing_saved_without_a_failure(self):
+        outcomes = [TestOutcome(Test(), None), TestOutcome(Test(), None), self.run_outcome(100)]
+        self.assertEqual(get_saved_time_ms(outcomes, TestCancellation()), 0)
+        self.assertEqual(get_saved_time_ms(outcomes, None), 0)
+
+
+class UserPages(KeysetPaginationMixin):
+    paginate_by = 3
+    keyset_ordering = ('last_name', 'id')
+
+    def get_page(self, **params):
+        self.request = RequestFactory().get('/', params)
+        return self.paginate_queryset(User.objects.all(), self.paginate_by)[1]
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # several users with the same last name, so pages are split between rows with equal first keys
+        for number, last_name in enumerate('aabbbbbcd'):
+            User.objects.create(username=f'user{number}', last_name=last_name)
+        cls.ordered = list(User.objects.order_by('last_name', 'id'))
+
+    def setUp(self):
+        self.pages = UserPages()
+
+    def test_forward(self):
+        rows = []
+        page = self.pages.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            rows.extend(page)
+            if not page.has_next():
+                break
+            page = self.pages.get_page(after=page.next_cursor)
+            self.assertTrue(page.has_previous())
+        self.assertEqual(rows, self.ordered)
+
+    def test_back(self):
+        first = self.pages.get_page()
+        second = self.pages.get_page(after=first.next_cursor)
+        third = self.pages.get_page(after=second.next_cursor)
+        self.assertFalse(third.has_next())
+        self.assertEqual(list(self.pages.get_page(before=third.previous_cursor)), list(second))
+        back = self.pages.get_page(before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_bad_cursor(self):
+        with self.assertRaises(Http404):
+            self.pages.get_page(after='garbage')
+
+
+class PickFairlyTest(SimpleTestCase):
+    def test_authors_take_turns(self):
+        now = timezone.now()
+        candidates = [
+            (1, 'busy', QueuePriority.PRACTICE, now),
+            (2, 'busy', QueuePriority.PRACTICE, now + timedelta(seconds=1)),
+            (3, 'busy', QueuePriority.PRACTICE, now + timedelta(seconds=2)),
+            (4, 'other', QueuePriority.PRACTICE, now + timedelta(seconds=3)),
+            (5, 'third', QueuePriority.PRACTICE, now + timedelta(seconds=4)),
+        ]
+        self.assertEqual(pick_fairly(candidates, 4), [1, 4, 5, 2])
+
+    def test_priorities_go_first(self):
+        now = timezone.now()
+        candidates = [
+            (1, 'busy', QueuePriority.PRACTICE, now),
+            (2, 'other', QueuePriority.REJUDGE, now),
+            (3, 'busy', QueuePriority.CONTEST, now + timedelta(seconds=1)),
+        ]
+        self.assertEqual(pick_fairly(candidates, 3), [3, 1, 2])
+
+
+@override_settings(JUDGE_CLAIM_WINDOW=10, JUDGE_CLAIM_PER_AUTHOR=2)
+class ClaimSolutionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.task = AbstractTask.objects.create(title='task', answer_type=TaskAnswerType.CONSTANT_ANSWER)
+        cls.busy = User.objects.create(username='busy')
+        cls.other = User.objects.create(username='other')
+
+    def submit(self, author, created):
+        code_file = CodeFile.objects.create(file='main.py', language='Python3', code='print(1)')
+        return Solution.objects.create(author=author, code_file=code_file, task=self.task, created=created)
+
+    def test_busy_author_does_not_fill_the_window(self):
+        now = timezone.now()
+        busy = [self.submit(self.busy, now - timedelta(minutes=30) + timedelta(seconds=number))
+                for number in range(20)]
+        other = self.submit(self.other, now)
+
+        self.assertEqual(claim_solutions(node=1, limit=2), [busy[0].id, other.id])
+        other.refresh_from_db()
+        self.assertEqual((other.status, other.node), (Status.QUEUED, 1))
+        # only the first solutions of an author get into the window
+        self.assertEqual(claim_solutions(node=1, limit=3), [busy[1].id, busy[2].id])
+
+    def test_languages_of_the_node(self):
+        solution = self.submit(self.other, timezone.now())
+        self.assertEqual(claim_solutions(node=1, limit=1, languages=['C++17']), [])
+        self.assertEqual(claim_solutions(node=1, limit=1, languages=['Python3']), [solution.id])
+
+
+class EnsureFilesTest(TestCase):
+    def test_tests_version_is_kept(self):
+        task = AbstractTask.objects.create(title='task', answer_type=TaskAnswerType.CONSTANT_ANSWER)
+        test = Test.objects.create(task=task, content='1 2', right_answer='3')
+        # a test saved before the test storage
+        Test.objects.filter(pk=test.pk).update(input_hash='', input_size=0, answer_hash='', answer_size=0)
+        task.refresh_from_db()
+        test.refresh_from_db()
+
+        test.ensure_files()
+        test.refresh_from_db()
+        self.assertTrue(test_storage.exists(test.input_hash))
+        self.assertEqual(test.answer_size, 1)
+        self.assertEqual(AbstractTask.objects.get(pk=task.pk).tests_version, task.tests_version)
+
+
+class CompileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = CompileCache(os.path.join(self.directory.name, 'cache'), 1)
+        self.work_dirs = [os.path.join(self.directory.name, name) for name in ('first', 'second')]
+        for work_dir in self.work_dirs:
+            os.mkdir(work_dir)
+
+    def test_entry_evicted_while_fetched(self):
+        for name in ('main', 'lib.so'):
+            with open(os.path.join(self.work_dirs[0], name), 'w') as file:
+                file.write(name)
+        self.cache.store('key', self.work_dirs[0], ['main', 'lib.so'])
+        copy = shutil.copy2
+
+        def copy_and_evict(source, destination):
+            copy(source, destination)
+            self.cache.remove(self.cache.get_path('key'))
+
+        with mock.patch('shutil.copy2', copy_and_evict):
+            self.assertFalse(self.cache.fetch('key', self.work_dirs[1]))
+        self.assertEqual(os.listdir(self.work_dirs[1]), [])
+        self.assertEqual(os.listdir(self.cache.root), [])
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Toolchain:
+    def __init__(self, language, label, extension, run, build=None, source=None, time_multiplier=1,
+                 memory_overhead_megabytes=0, fork_server=None,
+                 precompiled_headers=(), header_build=None, probe=None):
+        self.language = language
+        self.label = label
+        self.extension = extension
+        # extension of uploaded code files
+        self.source = source or f'main.{extension}'
+        # name of the file the code is written to in the judge
+        self.build = build
+        # compiler call, None for interpreted languages
+        self.run = run
+        # command which runs the solution inside of the working directory
+        self.time_multiplier = time_multiplier
+        self.memory_overhead_megabytes = memory_overhead_megabytes
+        # runtimes with a slow start get more than the task limits
+        self.fork_server = fork_server if settings.JUDGE_PYTHON_FORK_SERVER else None
+        # Python interpreter which runs the solution from its fork server instead of `run`
+        self.precompiled_headers = precompiled_headers
+        self.header_build = header_build
+        # headers precompiled once per node with `header_build`, which must have the flags of `build`
+        self.probe = probe
+        # command which succeeds only on judge nodes able to run the language
+
+    def get_time_limit(self, time_limit_seconds):
+        return time_limit_seconds * self.time_multiplier
+
+    def get_memory_limit(self, memory_limit_megabytes):
+        return memory_limit_megabytes + self.memory_overhead_megabytes
+
+    def is_available(self):
+        if self.probe is None:
+            return True
+        try:
+            result = subprocess.run(self.probe, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL, timeout=settings.JUDGE_PROBE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+
+    def get_header_dir(self):
+        # flags are part of the name, a header precompiled with other flags is never used
+        key = hashlib.sha256('\0'.join(self.header_build).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(settings.JUDGE_PRECOMPILED_HEADERS_DIR, key)
+
+    def get_build_command(self):
+        if self.precompiled_headers and settings.JUDGE_PRECOMPILED_HEADERS_DIR is not None:
+            header_dir = self.get_header_dir()
+            if all(os.path.exists(os.path.join(header_dir, f'{header}.gch')) for header in self.precompiled_headers):
+                # the compiler takes header.gch from the first include directory instead of the header
+                return [self.build[0], '-I', header_dir, *self.build[1:]]
+        return self.build
+
+    def prepare(self):
+        if not self.precompiled_headers or settings.JUDGE_PRECOMPILED_HEADERS_DIR is None:
+            return
+        header_dir = self.get_header_dir()
+        for header in self.precompiled_headers:
+            path = os.path.join(header_dir, f'{header}.gch')
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.TemporaryDirectory(dir=header_dir) as tmp_dir:
+                wrapper = os.path.join(tmp_dir, 'header.h')
+                with open(wrapper, 'w') as file:
+                    file.write(f'#include <{header}>\n')
+                result = subprocess.run(
+                    [*self.header_build, '-x', 'c++-header', '-o', os.path.join(tmp_dir, 'header.gch'), wrapper],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                )
+                if result.returncode != 0:
+                    logger.warning('Header %s was not precompiled: %s', header, result.stdout.decode('utf-8', 'replace'))
+                    continue
+                # judge processes see either no header or the whole one
+                os.replace(os.path.join(tmp_dir, 'header.gch'), path)
+            logger.info('Precompiled %s for %s', header, ' '.join(self.header_build))
+
+
+@lru_cache(maxsize=None)
+def get_toolchains():
+    return {language: Toolchain(language, **config) for language, config in settings.JUDGE_LANGUAGES.items()}
+
+
+def get_toolchain(language):
+    return get_toolchains()[language]
+
+
+def get_language_choices():
+    return [(language, toolchain.label) for language, toolchain in get_toolchains().items()]
+
+
+def get_default_language():
+    return settings.JUDGE_DEFAULT_LANGUAGE
+
+
+def get_language_label(language):
+    toolchain = get_toolchains().get(language)
+    return toolchain.label if toolchain is not None else language
+
+
+def prepare_toolchains():
+    # run once when a judge node starts, returns the languages the node is able to judge
+    available = []
+    for language, toolchain in get_toolchains().items():
+        if not toolchain.is_available():
+            logger.warning('Language %s is not available on this node: %s failed', language, toolchain.probe)
+            continue
+        toolchain.prepare()
+        available.append(language)
+    return available